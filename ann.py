@@ -0,0 +1,276 @@
+"""
+Approximate Nearest-Neighbor Engine (random-projection LSH)
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: similarity.py
+
+An optional alternative to the exact top-K index for catalogues where exact
+item × item scoring gets too expensive.  Every L2-normalised movie vector is
+hashed by the signs of its projections onto random hyperplanes (SimHash);
+movies at a small angle — high cosine similarity — land in the same bucket
+with high probability.  A query gathers the movies sharing its bucket in any
+of several hash tables (optionally also probing every bucket one bit away),
+then re-ranks only those candidates by exact cosine.  Pure NumPy/SciPy, no
+external service.
+
+All tables live in one sorted array of (table, code) keys, so a query finds
+every probed bucket with a single searchsorted.  Candidates are re-ranked on
+a dense float32 copy of the normalized vectors when the matrix is dense and
+small enough (DENSE_MIN_DENSITY, DENSE_MAX_BYTES), otherwise straight from
+the float32 CSR arrays.  When the buckets cover a large share of the catalogue,
+scoring every movie in one pass is cheaper than gathering candidates, so a
+query does that instead (SCAN_FRACTION).
+
+Knobs
+-----
+n_tables : more tables  → more candidates → higher recall, slower queries
+n_bits   : more bits    → smaller buckets → fewer candidates, lower recall
+           (default: log2(n_movies / BUCKET_SIZE), see auto_bits)
+probe    : also visit the n_bits neighboring buckets of every table
+
+recall_report() measures recall@K and latency against the exact engine so
+settings can be chosen from real numbers:
+
+    python ann.py --tables 4 8 16 --bits 8 12 16 --top-n 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from similarity import BLOCK_SIZE, normalize_rows, top_k_rows
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+N_TABLES          = 16     # independent hash tables
+N_BITS            = None   # hyperplanes (bits) per table, at most 32;
+                           # None derives it from the catalogue size
+BUCKET_SIZE       = 8      # target movies per bucket when n_bits is derived
+PROBE             = True   # multi-probe: also visit buckets at Hamming distance 1
+SCAN_FRACTION     = 0.3    # candidates (share of the catalogue) above which
+                           # a query scores every movie instead
+DENSE_MIN_DENSITY = 0.1    # keep a dense copy of the vectors for re-ranking
+DENSE_MAX_BYTES   = 256 << 20  # only if the matrix is this dense and this small
+SEED              = 0
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────────
+def auto_bits(n_movies: int, bucket_size: int = BUCKET_SIZE) -> int:
+    """Bits per table giving buckets of about `bucket_size` movies (1 to 32)."""
+    return int(np.clip(round(np.log2(max(n_movies, 1) / bucket_size)), 1, 32))
+
+
+def _ranges(starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, start + size) over every pair."""
+    offsets = np.cumsum(sizes) - sizes
+    return np.repeat(starts - offsets, sizes) + np.arange(sizes.sum())
+
+
+# ── LSH Index ──────────────────────────────────────────────────────────────────
+class LSHIndex:
+    """
+    Random-hyperplane LSH over the rows of a movies × users matrix.
+
+    Parameters
+    ----------
+    matrix   : CSR matrix  (movies × users)
+    n_tables : int         Number of hash tables.
+    n_bits   : int | None  Hyperplanes per table (≤ 32); None → auto_bits.
+    probe    : bool        Visit the n_bits adjacent buckets as well.
+    seed     : int         Seed for the random hyperplanes.
+    """
+
+    def __init__(
+        self,
+        matrix: csr_matrix,
+        n_tables: int = N_TABLES,
+        n_bits: int | None = N_BITS,
+        probe: bool = PROBE,
+        seed: int = SEED,
+    ):
+        n_movies, n_users = matrix.shape
+        if n_bits is None:
+            n_bits = auto_bits(n_movies)
+        if not 1 <= n_bits <= 32:
+            raise ValueError(f"n_bits must be between 1 and 32, got {n_bits}")
+
+        self.n_tables   = n_tables
+        self.n_bits     = n_bits
+        self.probe      = probe
+        self.normalized = normalize_rows(matrix).astype(np.float32)
+        self.vectors    = None
+        dense_bytes     = n_movies * n_users * 4
+        if dense_bytes <= DENSE_MAX_BYTES and matrix.nnz * 4 >= DENSE_MIN_DENSITY * dense_bytes:
+            self.vectors = self.normalized.toarray()
+
+        rng    = np.random.default_rng(seed)
+        planes = rng.standard_normal((n_users, n_tables * n_bits)).astype(np.float32)
+        weight = (np.uint32(1) << np.arange(n_bits, dtype=np.uint32))
+
+        # Signatures, one uint32 code per (movie, table), computed in blocks
+        self.codes = np.empty((n_movies, n_tables), dtype=np.uint32)
+        for start in range(0, n_movies, BLOCK_SIZE):
+            stop = start + BLOCK_SIZE
+            bits = np.asarray(self.normalized[start:stop] @ planes) > 0
+            bits = bits.reshape(-1, n_tables, n_bits)
+            self.codes[start:stop] = (bits * weight).sum(axis=2, dtype=np.uint32)
+
+        # Every table in one sorted array of table << 32 | code keys, so a
+        # bucket in any table is a searchsorted range
+        self.tables  = (np.arange(n_tables, dtype=np.uint64) << np.uint64(32))[:, np.newaxis]
+        keys         = (self.tables | self.codes.T.astype(np.uint64)).ravel()
+        order        = np.argsort(keys, kind="stable")
+        self.keys    = keys[order]
+        self.members = (order % max(n_movies, 1)).astype(np.int32)
+        self.probe_masks = np.concatenate(
+            [[0], weight if probe else np.empty(0, dtype=np.uint32)]
+        ).astype(np.uint32)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the hash tables and the dense re-ranking copy."""
+        dense = 0 if self.vectors is None else self.vectors.nbytes
+        return self.codes.nbytes + self.keys.nbytes + self.members.nbytes + dense
+
+    def candidates(self, row: int) -> np.ndarray:
+        """Movies sharing a (probed) bucket with `row` in any table."""
+        probes = (self.tables | (self.codes[row][:, np.newaxis] ^ self.probe_masks)).ravel()
+        lo     = np.searchsorted(self.keys, probes, side="left")
+        hi     = np.searchsorted(self.keys, probes, side="right")
+        found  = np.unique(self.members[_ranges(lo, hi - lo)])
+        return found[found != row]
+
+    def _query_vector(self, row: int) -> np.ndarray:
+        if self.vectors is not None:
+            return self.vectors[row]
+        norm  = self.normalized
+        query = np.zeros(norm.shape[1], dtype=np.float32)
+        span  = slice(norm.indptr[row], norm.indptr[row + 1])
+        query[norm.indices[span]] = norm.data[span]
+        return query
+
+    def _scores(self, candidates: np.ndarray | None, row: int) -> np.ndarray:
+        """Exact cosine of `row` with every candidate (None: every movie)."""
+        query = self._query_vector(row)
+        if candidates is None:
+            source = self.normalized if self.vectors is None else self.vectors
+            return source @ query
+        if self.vectors is not None:
+            return self.vectors[candidates] @ query
+
+        # Dot products straight from the CSR arrays: the candidates' stored
+        # entries times the query's dense vector, summed per candidate
+        norm   = self.normalized
+        starts = norm.indptr[candidates]
+        sizes  = norm.indptr[candidates + 1] - starts
+        at     = _ranges(starts, sizes)
+        owner  = np.repeat(np.arange(len(candidates)), sizes)
+        return np.bincount(
+            owner, weights=norm.data[at] * query[norm.indices[at]], minlength=len(candidates)
+        )
+
+    def query(self, row: int, top_n: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-N neighbors of movie `row`, best first.
+
+        May return fewer than top_n movies when the buckets are sparse.
+        """
+        candidates = self.candidates(row)
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        if len(candidates) >= SCAN_FRACTION * len(self.codes):
+            scores      = self._scores(None, row)
+            scores[row] = -np.inf
+            ids, vals   = top_k_rows(scores[np.newaxis], min(top_n, len(scores) - 1))
+            return ids[0], vals[0]
+
+        ids, vals = top_k_rows(self._scores(candidates, row)[np.newaxis], top_n)
+        return candidates[ids[0]], vals[0]
+
+
+# ── Recall Report ──────────────────────────────────────────────────────────────
+def recall_report(
+    index: LSHIndex,
+    top_n: int = 10,
+    sample: int | None = 200,
+    seed: int = SEED,
+) -> dict:
+    """
+    Measure an alternative engine against the exact one.
+
+    For a random sample of movies, compares index.query with the exact
+    recommender.get_recommendations output.  Works for any engine exposing
+    query(row, top_n); engines without candidates() count as scoring the
+    whole catalogue.
+
+    Returns
+    -------
+    dict  recall@top_n (mean over the sample), mean candidates per query,
+          and p50/p95 latency in milliseconds for both engines.
+    """
+    from recommender import get_model, get_recommendations
+
+    model = get_model()
+    n     = len(model.movie_index)
+    rows  = np.arange(n)
+    if sample is not None and sample < n:
+        rows = np.random.default_rng(seed).choice(n, size=sample, replace=False)
+
+    recalls, n_candidates, approx_ms, exact_ms = [], [], [], []
+    for row in rows:
+        title = model.movie_index[row]
+
+        started = time.perf_counter()
+        exact   = get_recommendations(title, top_n, cached=False)
+        exact_ms.append((time.perf_counter() - started) * 1e3)
+
+        started = time.perf_counter()
+        ids, _  = index.query(row, top_n)
+        approx_ms.append((time.perf_counter() - started) * 1e3)
+
+        approx = set(model.movie_index[ids])
+        recalls.append(len(approx.intersection(exact)) / max(len(exact), 1))
+        if hasattr(index, "candidates"):
+            n_candidates.append(len(index.candidates(row)))
+        else:
+            n_candidates.append(n - 1)
+
+    return {
+        "top_n":          top_n,
+        "queries":        len(rows),
+        "recall":         float(np.mean(recalls)),
+        "candidates":     float(np.mean(n_candidates)),
+        "approx_p50_ms":  float(np.percentile(approx_ms, 50)),
+        "approx_p95_ms":  float(np.percentile(approx_ms, 95)),
+        "exact_p50_ms":   float(np.percentile(exact_ms, 50)),
+        "exact_p95_ms":   float(np.percentile(exact_ms, 95)),
+    }
+
+
+# ── Entry Point ────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    from recommender import get_model
+
+    parser = argparse.ArgumentParser(description="Recall/latency sweep for the LSH engine.")
+    parser.add_argument("--tables", type=int, nargs="+", default=[N_TABLES])
+    parser.add_argument("--bits", type=int, nargs="+", default=[N_BITS],
+                        help="bits per table (default: derived from the catalogue size)")
+    parser.add_argument("--no-probe", action="store_true")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=200)
+    args = parser.parse_args()
+
+    matrix = get_model().matrix
+    print(f"{'tables':>6} {'bits':>4} {'recall':>7} {'cands':>7} "
+          f"{'ann p50':>8} {'ann p95':>8} {'exact p50':>9}")
+    for n_tables in args.tables:
+        for n_bits in args.bits:
+            index  = LSHIndex(matrix, n_tables, n_bits, probe=not args.no_probe)
+            report = recall_report(index, args.top_n, args.sample)
+            print(
+                f"{n_tables:>6} {index.n_bits:>4} {report['recall']:>7.3f} "
+                f"{report['candidates']:>7.1f} {report['approx_p50_ms']:>7.3f}ms "
+                f"{report['approx_p95_ms']:>7.3f}ms {report['exact_p50_ms']:>8.3f}ms"
+            )
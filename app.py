@@ -2,10 +2,28 @@
 Phase 3 (v2): Streamlit Application — upgraded with real-time search
 Movie Recommendation System — Item-Based Collaborative Filtering
 Depends on: recommender.py (Phase 2) → data_pipeline.py (Phase 1)
+
+Streamlit reruns the script on every interaction, so the work is split by
+how often it changes:
+
+  - the model (memory-mapped from its artifact), the title list and the
+    search index are st.cache_resource singletons, shared by every session
+    and never copied;
+  - search results and rendered recommendation cards are memoised per
+    (query or title, model version) with st.cache_data;
+  - the search box, selectbox, button and results live in one st.fragment,
+    so a keystroke or click reruns only that panel — not the CSS, hero or
+    footer.
+
+Append ?timing=1 to the URL to show how long each rerun took.
 """
 
+import time
+
 import streamlit as st
-from recommender import get_recommendations, get_all_titles
+
+import recommender
+from instrumentation import observe
 
 # ── Page Config ────────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -15,7 +33,7 @@ st.set_page_config(
 )
 
 # ── Custom CSS ─────────────────────────────────────────────────────────────────
-st.markdown("""
+CSS = """
 <style>
 @import url('https://fonts.googleapis.com/css2?family=Playfair+Display:ital,wght@0,700;1,400&family=Outfit:wght@300;400;500;600&display=swap');
 
@@ -377,14 +395,36 @@ div[data-baseweb="select"] > div {
     font-size: 0.95rem;
 }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+SEARCH_LIMIT = 50   # titles offered per query (prebuilt n-gram index, see search.py)
+TOP_N        = 5
+
 
+# ── Shared Resources ───────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner="Loading the model…")
+def load_model() -> recommender.Model:
+    """
+    Open the prebuilt model artifact once per server process.
 
-# ── Cached Data Loader ─────────────────────────────────────────────────────────
-@st.cache_data
-def load_titles() -> list[str]:
-    """Load and cache all movie titles — runs once per session."""
-    return get_all_titles()
+    The arrays are memory-mapped (see model_store.py), and the search
+    index is built here too, so no session ever pays for either.
+    """
+    model = recommender.get_model()
+    recommender.get_search_index()
+    return model
+
+
+@st.cache_resource
+def load_titles(version: str) -> list[str]:
+    """All titles (A→Z), shared by reference rather than copied per rerun."""
+    return recommender.get_all_titles()
+
+
+@st.cache_data(max_entries=4_096, show_spinner=False)
+def search(query: str, version: str) -> tuple[list[str], int]:
+    """Memoised search_titles: (top SEARCH_LIMIT titles, total matches)."""
+    return recommender.search_titles(query, limit=SEARCH_LIMIT)
 
 
 # ── Helper: split title and year ───────────────────────────────────────────────
@@ -396,8 +436,69 @@ def split_title_year(full_title: str) -> tuple[str, str]:
     return full_title, ""
 
 
+@st.cache_data(max_entries=4_096, show_spinner=False)
+def recommendation_html(selected_movie: str, version: str) -> str:
+    """The whole results block for one title, rendered once per model version."""
+    name, year = split_title_year(selected_movie)
+    year_html  = f"&nbsp;<span style='opacity:0.45; font-weight:300'>({year})</span>" if year else ""
+    header     = f"""
+    <div class="section-divider">
+        <div class="line"></div>
+        <div class="label">Your recommendations</div>
+        <div class="line"></div>
+    </div>
+    <div class="selected-badge">
+        🎬 &nbsp; Because you liked &nbsp;<strong>{name}</strong>{year_html}
+    </div>
+    """
+
+    results = recommender.get_recommendations(selected_movie, top_n=TOP_N)
+    if isinstance(results, str):
+        return header.strip() + f'\n<div class="error-box">⚠️ &nbsp;{results}</div>'
+
+    cards = []
+    for rank, title in enumerate(results, start=1):
+        card_name, card_year = split_title_year(title)
+        year_div = f"<div class='card-year'>{card_year}</div>" if card_year else ""
+        cards.append(f"""
+        <div class="movie-card">
+            <div class="card-rank">{rank:02d}</div>
+            <div class="card-body">
+                <div class="card-title">{card_name}</div>
+                {year_div}
+            </div>
+            <div class="card-arrow">→</div>
+        </div>
+        """)
+
+    # One markdown element; blank lines would end the HTML block, so none
+    return "\n".join([
+        header.strip(),
+        "<div>", *(card.strip() for card in cards), "</div>",
+        """
+    <div style="margin-top:1.2rem; font-size:0.73rem; color:#3a3a3a;
+                text-align:center; letter-spacing:0.06em;">
+        Ranked by cosine similarity score
+    </div>
+        """.strip(),
+    ])
+
+
+def show_timing(started: float, scope: str) -> None:
+    """Report this rerun's duration to the metrics hooks, and on screen with ?timing=1."""
+    elapsed = time.perf_counter() - started
+    observe("app_rerun", elapsed, scope=scope)
+    if st.query_params.get("timing"):
+        st.caption(f"⏱ {scope} rerun {elapsed * 1e3:.1f} ms")
+
+
+# ── Static Page ────────────────────────────────────────────────────────────────
+page_started = time.perf_counter()
+st.markdown(CSS, unsafe_allow_html=True)
+
 # ── Load data ──────────────────────────────────────────────────────────────────
-all_titles   = load_titles()
+model        = load_model()
+all_titles   = load_titles(model.version)
 total_movies = len(all_titles)
 
 
@@ -428,117 +529,87 @@ st.markdown(f"""
 """, unsafe_allow_html=True)
 
 
-# ── Search Bar ─────────────────────────────────────────────────────────────────
-st.markdown('<div class="search-label">🔍 &nbsp; Search for a movie</div>', unsafe_allow_html=True)
-
-query = st.text_input(
-    label="",
-    placeholder="Start typing — e.g. Pulp Fiction, The Matrix, Toy Story…",
-    label_visibility="collapsed",
-    key="search_query",
-)
-
-# ── Real-time filter ───────────────────────────────────────────────────────────
-q = query.strip().lower()
-filtered = [t for t in all_titles if q in t.lower()] if q else all_titles
-match_count = len(filtered)
-
-# ── Match counter pill (only shown when user has typed something) ──────────────
-if q:
-    pill_class = "match-pill" if match_count > 0 else "match-pill no-match"
-    pill_text  = f"{match_count} match{'es' if match_count != 1 else ''} found" if match_count > 0 else "No matches"
-    st.markdown(f"""
-    <div class="{pill_class}">
-        <span class="dot"></span>{pill_text}
-    </div>
-    """, unsafe_allow_html=True)
-
+# ── Search & Results Panel ─────────────────────────────────────────────────────
+@st.fragment
+def recommender_panel(all_titles: list[str], version: str) -> None:
+    """Everything a keystroke or click can change; reruns on its own."""
+    started = time.perf_counter()
 
-# ── Selectbox or no-results message ───────────────────────────────────────────
-selected_movie = None
+    st.markdown('<div class="search-label">🔍 &nbsp; Search for a movie</div>', unsafe_allow_html=True)
 
-if match_count == 0:
-    st.markdown(f"""
-    <div class="no-results">
-        No films matching <strong>"{query}"</strong> were found.<br>
-        Try a shorter keyword or check the spelling.
-    </div>
-    """, unsafe_allow_html=True)
-
-else:
-    st.markdown(
-        '<div class="search-label" style="margin-top:0.7rem">↳ &nbsp; Select from results</div>',
-        unsafe_allow_html=True,
-    )
-    selected_movie = st.selectbox(
-        label="",
-        options=filtered,
+    query = st.text_input(
+        label="Search",
+        placeholder="Start typing — e.g. Pulp Fiction, The Matrix, Toy Story…",
         label_visibility="collapsed",
-        key="movie_select",
+        key="search_query",
     )
-    st.markdown("""
-    <div class="hint-row">
-        <span class="kbd">↑</span><span class="kbd">↓</span> to navigate &nbsp;·&nbsp;
-        <span class="kbd">Enter</span> to confirm &nbsp;·&nbsp;
-        <span class="kbd">Esc</span> to close
-    </div>
-    """, unsafe_allow_html=True)
-
 
-# ── Recommend Button ───────────────────────────────────────────────────────────
-recommend_clicked = st.button(
-    "✦  Get Recommendations",
-    disabled=(selected_movie is None),
-)
-
-
-# ── Results ────────────────────────────────────────────────────────────────────
-if recommend_clicked and selected_movie:
-
-    name, year = split_title_year(selected_movie)
-    year_html  = f"&nbsp;<span style='opacity:0.45; font-weight:300'>({year})</span>" if year else ""
+    # ── Real-time filter ───────────────────────────────────────────────────────
+    q = query.strip()
+    if q:
+        filtered, match_count = search(q, version)
+    else:
+        filtered, match_count = all_titles, len(all_titles)
+
+    # ── Match counter pill (only shown when user has typed something) ──────────
+    if q:
+        pill_class = "match-pill" if match_count > 0 else "match-pill no-match"
+        pill_text  = f"{match_count} match{'es' if match_count != 1 else ''} found" if match_count > 0 else "No matches"
+        if match_count > len(filtered):
+            pill_text += f" · showing top {len(filtered)}"
+        st.markdown(f"""
+        <div class="{pill_class}">
+            <span class="dot"></span>{pill_text}
+        </div>
+        """, unsafe_allow_html=True)
 
-    st.markdown(f"""
-    <div class="section-divider">
-        <div class="line"></div>
-        <div class="label">Your recommendations</div>
-        <div class="line"></div>
-    </div>
-    <div class="selected-badge">
-        🎬 &nbsp; Because you liked &nbsp;<strong>{name}</strong>{year_html}
-    </div>
-    """, unsafe_allow_html=True)
+    # ── Selectbox or no-results message ───────────────────────────────────────
+    selected_movie = None
 
-    with st.spinner("Calculating similarity scores…"):
-        results = get_recommendations(selected_movie, top_n=5)
+    if match_count == 0:
+        st.markdown(f"""
+        <div class="no-results">
+            No films matching <strong>"{query}"</strong> were found.<br>
+            Try a shorter keyword or check the spelling.
+        </div>
+        """, unsafe_allow_html=True)
 
-    if isinstance(results, str):
+    else:
         st.markdown(
-            f'<div class="error-box">⚠️ &nbsp;{results}</div>',
+            '<div class="search-label" style="margin-top:0.7rem">↳ &nbsp; Select from results</div>',
             unsafe_allow_html=True,
         )
-    else:
-        for rank, title in enumerate(results, start=1):
-            card_name, card_year = split_title_year(title)
-            year_div = f"<div class='card-year'>{card_year}</div>" if card_year else ""
-            st.markdown(f"""
-            <div class="movie-card">
-                <div class="card-rank">{rank:02d}</div>
-                <div class="card-body">
-                    <div class="card-title">{card_name}</div>
-                    {year_div}
-                </div>
-                <div class="card-arrow">→</div>
-            </div>
-            """, unsafe_allow_html=True)
-
+        selected_movie = st.selectbox(
+            label="Movie",
+            options=filtered,
+            label_visibility="collapsed",
+            key="movie_select",
+        )
         st.markdown("""
-        <div style="margin-top:1.2rem; font-size:0.73rem; color:#3a3a3a;
-                    text-align:center; letter-spacing:0.06em;">
-            Ranked by cosine similarity score
+        <div class="hint-row">
+            <span class="kbd">↑</span><span class="kbd">↓</span> to navigate &nbsp;·&nbsp;
+            <span class="kbd">Enter</span> to confirm &nbsp;·&nbsp;
+            <span class="kbd">Esc</span> to close
         </div>
         """, unsafe_allow_html=True)
 
+    # ── Recommend Button ───────────────────────────────────────────────────────
+    recommend_clicked = st.button(
+        "✦  Get Recommendations",
+        disabled=(selected_movie is None),
+    )
+
+    # ── Results ────────────────────────────────────────────────────────────────
+    if recommend_clicked and selected_movie:
+        with st.spinner("Calculating similarity scores…"):
+            results_html = recommendation_html(selected_movie, version)
+        st.markdown(results_html, unsafe_allow_html=True)
+
+    show_timing(started, "fragment")
+
+
+recommender_panel(all_titles, model.version)
+
 
 # ── Footer ─────────────────────────────────────────────────────────────────────
 st.markdown("""
@@ -546,4 +617,6 @@ st.markdown("""
     <div class="footer-brand">CineMatch</div>
     <div>MovieLens Small &nbsp;·&nbsp; Scikit-learn &nbsp;·&nbsp; Streamlit</div>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+show_timing(page_started, "full")
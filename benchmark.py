@@ -0,0 +1,405 @@
+"""
+Benchmark Suite
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: data_pipeline.py (Phase 1), similarity.py, recommender.py (Phase 2)
+
+Times every pipeline stage and the query paths, on the bundled data/ and on
+synthetic ratings scaled up from it, and compares the numbers with a stored
+baseline so regressions are flagged automatically:
+
+    stage                 measures
+    load_raw_data_cold    CSV parse + columnar cache write (ingest.py)
+    load_raw_data         cached load
+    filter_noise
+    build_pivot_table     dense pivot (skipped above --max-pivot-mb)
+    build_csr_matrix      pivot → CSR
+    build_sparse_matrix   the pipeline's direct CSR build
+    build_neighbor_index  top-K similarity build (similarity.METRIC)
+    build_neighbor_index:<metric>   the same build with each --metrics entry,
+                          plus its top-K overlap with the default metric
+    query_single          get_recommendations, uncached (p50/p95/p99)
+    query_batch           get_recommendations_batch (p50/p95/p99 per batch)
+    build_engine:<name>   each --engines entry (recommender.ENGINES: svd,
+                          als, lsh), plus the memory its index holds
+    query_engine:<name>   get_recommendations(engine=<name>), uncached, plus
+                          its recall@5 against query_single
+
+Every stage reports wall time, CPU time, peak RSS and row counts.  Each
+scale runs in its own process, so peak RSS is not inherited between scales.
+
+    python benchmark.py --scales 1 10 100 --output benchmarks/latest.json
+    python benchmark.py --scales 1 --save-baseline
+    python benchmark.py --scales 1            # compares with the baseline,
+                                              # exits 1 on a regression
+    python benchmark.py --scales 1 --check    # …and also when there is no
+                                              # baseline to compare with
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+BASELINE_PATH = "benchmarks/baseline.json"
+OUTPUT_PATH   = "benchmarks/latest.json"
+TOLERANCE     = 0.25    # flag anything more than 25% slower than the baseline…
+MIN_DELTA     = 0.005   # …and at least 5 ms slower (sub-ms stages are noise)
+MIN_QUERY_MS  = 0.1     # floor for query p95 regressions, in ms
+N_QUERIES     = 500
+BATCH_SIZE    = 64
+MAX_PIVOT_MB  = 1_024   # skip the dense pivot stages above this size
+ENGINES       = ("svd", "als", "lsh")   # alternative engines timed by default
+SEED          = 0
+
+
+# ── Memory ─────────────────────────────────────────────────────────────────────
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's high-water mark (Linux ≥ 4.0); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size since the last reset (or process start), in MB."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _process_peak_mb()
+
+
+def _process_peak_mb() -> float:
+    """Peak RSS over the whole process lifetime (unaffected by resets), in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+# ── Measurement ────────────────────────────────────────────────────────────────
+def measure(fn, *args, rows=None):
+    """
+    Run fn(*args) once; return (result, stats).
+
+    stats: seconds, cpu_seconds, peak_rss_mb and, when `rows` is given,
+    rows = rows(result).
+    """
+    _reset_peak_rss()
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = fn(*args)
+    stats  = {
+        "seconds":     time.perf_counter() - wall,
+        "cpu_seconds": time.process_time() - cpu,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if rows is not None:
+        stats["rows"] = int(rows(result))
+    return result, stats
+
+
+def latency(fn, calls) -> dict:
+    """Per-call latency percentiles (ms) of fn over the argument tuples in `calls`."""
+    samples = np.empty(len(calls))
+    _reset_peak_rss()
+    cpu = time.process_time()
+    for i, args in enumerate(calls):
+        started    = time.perf_counter()
+        fn(*args)
+        samples[i] = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(samples * 1e3, [50, 95, 99])
+    return {
+        "seconds":     float(samples.sum()),
+        "cpu_seconds": time.process_time() - cpu,
+        "peak_rss_mb": peak_rss_mb(),
+        "calls":       len(calls),
+        "p50_ms":      float(p50),
+        "p95_ms":      float(p95),
+        "p99_ms":      float(p99),
+    }
+
+
+# ── Synthetic Data ─────────────────────────────────────────────────────────────
+def write_synthetic(source_dir: str, target_dir: str, scale: int, seed: int = SEED) -> None:
+    """
+    Write a ratings.csv `scale` times the size of the source one.
+
+    Every replica gets fresh user ids; 20% of its ratings move to a movie
+    drawn from the real popularity distribution and every rating is jittered
+    by up to ±1 star, so replicas are similar to the real users without being
+    copies.  movies.csv is copied unchanged.
+    """
+    rng     = np.random.default_rng(seed)
+    ratings = pd.read_csv(os.path.join(source_dir, "ratings.csv"))
+    movies  = ratings["movieId"].to_numpy()
+    offset  = int(ratings["userId"].max())
+
+    os.makedirs(target_dir, exist_ok=True)
+    out_path = os.path.join(target_dir, "ratings.csv")
+    for replica in range(scale):
+        part = ratings.copy()
+        part["userId"] += replica * offset
+        if replica:
+            moved = rng.random(len(part)) < 0.2
+            part.loc[moved, "movieId"] = rng.choice(movies, size=int(moved.sum()))
+            jitter = rng.integers(-2, 3, size=len(part)) * 0.5
+            part["rating"] = np.clip(part["rating"] + jitter, 0.5, 5.0)
+        part.to_csv(out_path, mode="a" if replica else "w", header=not replica, index=False)
+
+    pd.read_csv(os.path.join(source_dir, "movies.csv")).to_csv(
+        os.path.join(target_dir, "movies.csv"), index=False
+    )
+
+
+# ── One Scale ──────────────────────────────────────────────────────────────────
+def run_scale(
+    data_dir: str,
+    max_pivot_mb: float = MAX_PIVOT_MB,
+    n_queries: int = N_QUERIES,
+    metrics: list[str] = (),
+    engines: list[str] = ENGINES,
+) -> dict:
+    """Run every stage on the CSVs in `data_dir`; return {stage: stats}."""
+    import shutil
+
+    import recommender
+    from data_pipeline import (
+        MIN_MOVIE_RATINGS,
+        build_csr_matrix,
+        build_pivot_table,
+        build_sparse_matrix,
+        filter_noise,
+    )
+    from ingest import CACHE_DIRNAME, MOVIES_COLUMNS, RATINGS_COLUMNS, load_table
+    from similarity import METRIC, build_neighbor_index
+
+    def load():
+        movies  = load_table(os.path.join(data_dir, "movies.csv"), MOVIES_COLUMNS)
+        ratings = load_table(os.path.join(data_dir, "ratings.csv"), RATINGS_COLUMNS)
+        return movies, ratings
+
+    stages = {}
+    shutil.rmtree(os.path.join(data_dir, CACHE_DIRNAME), ignore_errors=True)
+    _, stages["load_raw_data_cold"] = measure(load, rows=lambda r: len(r[1]))
+    (movies, ratings), stages["load_raw_data"] = measure(load, rows=lambda r: len(r[1]))
+
+    filtered, stages["filter_noise"] = measure(filter_noise, ratings, rows=len)
+    del ratings
+
+    n_movies = filtered["movieId"].nunique()
+    n_users  = filtered["userId"].nunique()
+    pivot_mb = n_movies * n_users * 8 / 2**20
+    if pivot_mb <= max_pivot_mb:
+        pivot, stages["build_pivot_table"] = measure(build_pivot_table, filtered, movies, rows=len)
+        _, stages["build_csr_matrix"] = measure(build_csr_matrix, pivot, rows=lambda m: m.nnz)
+        del pivot
+    else:
+        skipped = {"skipped": f"dense pivot would take {pivot_mb:,.0f} MB"}
+        stages["build_pivot_table"] = stages["build_csr_matrix"] = skipped
+
+    (matrix, movie_index, user_ids), stages["build_sparse_matrix"] = measure(
+        build_sparse_matrix, filtered, movies, rows=lambda r: r[0].nnz
+    )
+    neighbors, stages["build_neighbor_index"] = measure(
+        build_neighbor_index, matrix, rows=lambda n: len(n.ids)
+    )
+    for metric in metrics:
+        if metric == METRIC:
+            continue
+        other, stats = measure(
+            lambda: build_neighbor_index(matrix, metric=metric), rows=lambda n: len(n.ids)
+        )
+        shared = (other.ids[:, :, None] == neighbors.ids[:, None, :]).any(axis=2)
+        stats["overlap"] = float(shared.mean())
+        stages[f"build_neighbor_index:{metric}"] = stats
+
+    version = f"benchmark-{os.path.basename(os.path.normpath(data_dir))}"
+    recommender.set_model(recommender.Model(matrix, movie_index, user_ids, neighbors, version))
+
+    rng     = np.random.default_rng(SEED)
+    titles  = movie_index[rng.integers(0, len(movie_index), size=n_queries)].tolist()
+    stages["query_single"] = latency(
+        lambda t: recommender.get_recommendations(t, 5, cached=False),
+        [(t,) for t in titles],
+    )
+    batches = [titles[i:i + BATCH_SIZE] for i in range(0, len(titles), BATCH_SIZE)]
+    stages["query_batch"] = latency(
+        lambda b: recommender.get_recommendations_batch(b, 5), [(b,) for b in batches]
+    )
+    stages["query_batch"]["batch_size"] = BATCH_SIZE
+
+    exact = [recommender.get_recommendations(t, 5, cached=False) for t in titles]
+    for name in engines:
+        index, stats = measure(recommender.get_engine, name)
+        stats["memory_mb"] = index.nbytes / 2**20
+        stages[f"build_engine:{name}"] = stats
+
+        stats = latency(
+            lambda t: recommender.get_recommendations(t, 5, name, cached=False),
+            [(t,) for t in titles],
+        )
+        found = [recommender.get_recommendations(t, 5, name, cached=False) for t in titles]
+        stats["recall"] = float(np.mean([
+            len(set(got) & set(want)) / max(len(want), 1) for got, want in zip(found, exact)
+        ]))
+        stages[f"query_engine:{name}"] = stats
+
+    return {
+        "shape":             [int(n) for n in matrix.shape],
+        "nnz":               int(matrix.nnz),
+        "min_movie_ratings": MIN_MOVIE_RATINGS,
+        "stages":            stages,
+        "peak_rss_mb":       _process_peak_mb(),
+    }
+
+
+def _run_scale_subprocess(scale: int, source_dir: str, args) -> dict:
+    """Generate the data for one scale and benchmark it in a fresh process."""
+    with tempfile.TemporaryDirectory(prefix=f"bench-x{scale}-") as tmp:
+        data_dir = source_dir
+        if scale > 1:
+            data_dir = os.path.join(tmp, f"x{scale}")
+            write_synthetic(source_dir, data_dir, scale)
+        elif not args.in_place:
+            data_dir = os.path.join(tmp, "x1")
+            write_synthetic(source_dir, data_dir, 1)
+
+        out_path = os.path.join(tmp, "result.json")
+        subprocess.run(
+            [sys.executable, __file__, "--_worker", data_dir, out_path,
+             "--max-pivot-mb", str(args.max_pivot_mb), "--queries", str(args.queries),
+             "--metrics", *args.metrics, "--engines", *args.engines],
+            check=True,
+        )
+        with open(out_path) as fh:
+            return json.load(fh)
+
+
+# ── Baseline Comparison ────────────────────────────────────────────────────────
+def compare(current: dict, baseline: dict, tolerance: float = TOLERANCE) -> list[str]:
+    """
+    Regressions of `current` against `baseline`, as readable lines.
+
+    A stage regresses when its wall time (or, for query stages, its p95)
+    exceeds the baseline by more than `tolerance` and by at least MIN_DELTA
+    seconds (MIN_QUERY_MS for p95).  Scales or stages missing from either side are ignored.
+    """
+    problems = []
+    for scale, run in current["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if base is None:
+            continue
+        for stage, stats in run["stages"].items():
+            old = base["stages"].get(stage)
+            if old is None or "skipped" in stats or "skipped" in old:
+                continue
+            metric, floor = ("p95_ms", MIN_QUERY_MS) if "p95_ms" in stats else ("seconds", MIN_DELTA)
+            now, then = stats[metric], old[metric]
+            if now > then * (1 + tolerance) and now - then >= floor:
+                problems.append(
+                    f"x{scale} {stage}: {metric} {then:.4g} → {now:.4g} "
+                    f"(+{(now / then - 1):.0%})"
+                )
+    return problems
+
+
+def print_table(results: dict) -> None:
+    for scale, run in results["scales"].items():
+        width = max(22, *map(len, run["stages"]))
+        print(f"\n── x{scale}  shape={tuple(run['shape'])}  nnz={run['nnz']:,}")
+        print(f"{'stage':<{width}} {'wall':>9} {'cpu':>9} {'peak rss':>10} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for stage, s in run["stages"].items():
+            if "skipped" in s:
+                print(f"{stage:<{width}} skipped — {s['skipped']}")
+                continue
+            pct = "".join(
+                f" {s[k]:>7.3f}ms" if k in s else f" {'':>9}" for k in ("p50_ms", "p95_ms", "p99_ms")
+            )
+            extra = "".join(
+                f"  {label}={fmt.format(s[key])}"
+                for key, label, fmt in (
+                    ("overlap", "overlap", "{:.1%}"),
+                    ("recall", "recall@5", "{:.3f}"),
+                    ("memory_mb", "index", "{:.2f}MB"),
+                )
+                if key in s
+            )
+            print(f"{stage:<{width}} {s['seconds']:>8.3f}s {s['cpu_seconds']:>8.3f}s "
+                  f"{s['peak_rss_mb']:>8.1f}MB{pct}{extra}")
+
+
+# ── Entry Point ────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline and query paths.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--data-dir", default="data/")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write this run as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--max-pivot-mb", type=float, default=MAX_PIVOT_MB)
+    parser.add_argument("--in-place", action="store_true",
+                        help="run scale 1 on --data-dir itself (its ingest cache is rebuilt)")
+    parser.add_argument("--metrics", nargs="*", default=[],
+                        help="also time the neighbor build with these similarity metrics")
+    parser.add_argument("--engines", nargs="*", default=list(ENGINES),
+                        help="alternative engines to build and query (none: --engines)")
+    parser.add_argument("--check", action="store_true",
+                        help="exit 1 when there is no baseline to compare with")
+    parser.add_argument("--_worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._worker:
+        data_dir, out_path = args._worker
+        result = run_scale(data_dir, args.max_pivot_mb, args.queries, args.metrics, args.engines)
+        with open(out_path, "w") as fh:
+            json.dump(result, fh)
+        sys.exit(0)
+
+    results = {
+        "created":  time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python":   platform.python_version(),
+        "numpy":    np.__version__,
+        "machine":  platform.machine(),
+        "cpus":     os.cpu_count(),
+        "scales":   {str(s): _run_scale_subprocess(s, args.data_dir, args) for s in args.scales},
+    }
+    print_table(results)
+
+    target = args.baseline if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    with open(target, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"\n[benchmark] wrote {target}")
+
+    if args.save_baseline:
+        sys.exit(0)
+    if not os.path.exists(args.baseline):
+        print(f"[benchmark] no baseline at {args.baseline}; nothing was compared. "
+              f"Run with --save-baseline to create one.")
+        sys.exit(1 if args.check else 0)
+
+    with open(args.baseline) as fh:
+        regressions = compare(results, json.load(fh), args.tolerance)
+    if regressions:
+        print("\n[benchmark] REGRESSIONS against", args.baseline)
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print(f"[benchmark] no regressions against {args.baseline}")
@@ -0,0 +1,142 @@
+"""
+Compact Model Check
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: recommender.py (Phase 2), model_store.py, similarity.py
+
+Builds the compact variants of the model (float32 ratings, int32 indices,
+float16 or int8 neighbor scores; see model_store.compact_arrays) and checks
+them against the float64 reference before COMPACT is switched on:
+
+  - ranking: for every title, get_recommendations on the compact model must
+    return the reference top-N, except where the swapped movies' reference
+    scores are within RANK_TOLERANCE of each other (a near-tie);
+  - scores: every stored neighbor score must be within SCORE_TOLERANCE of
+    its exact float64 value under similarity.METRIC.
+
+Also reports the bytes each variant saves.  Exits 1 if a variant fails.
+
+    python compact.py --scores float16 int8 --top-n 10
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+import recommender
+from model_store import compact_arrays, model_nbytes
+from recommender import Model
+from similarity import BLOCK_SIZE, METRIC, SCORE_DTYPES, build_neighbor_index, get_metric
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+RANK_TOLERANCE  = 1e-3      # reference-score gap below which a swap is a tie
+SCORE_TOLERANCE = 1 / 127   # largest accepted stored-score error (one int8 step)
+
+
+# ── Check ──────────────────────────────────────────────────────────────────────
+def compact_model(reference: Model, score_dtype: str) -> Model:
+    """
+    The reference model compacted the way build_model ships it with COMPACT
+    on: neighbors built from the float64 matrix, then compact_arrays.
+    """
+    matrix, neighbors = compact_arrays(reference.matrix, reference.neighbors, score_dtype)
+    return Model(
+        matrix, reference.movie_index, reference.user_ids, neighbors,
+        f"{reference.version}-{score_dtype}",
+    )
+
+
+def check_ranking(
+    reference: Model,
+    candidate: Model,
+    top_n: int = 10,
+    rank_tolerance: float = RANK_TOLERANCE,
+) -> dict:
+    """
+    Compare get_recommendations on `candidate` with `reference`, title by title.
+
+    Returns
+    -------
+    dict  exact (share of identical top-N lists), tied (share that differ
+          only by near-ties), max_score_error, mismatches (titles that
+          differ beyond the tolerance) and ok.
+    """
+    metric     = get_metric(METRIC)
+    state      = metric.prepare(reference.matrix.astype(np.float64))
+    titles     = reference.movie_index
+    previous   = recommender.get_model()
+
+    try:
+        recommender.set_model(reference)
+        expected = [recommender.get_recommendations(t, top_n, cached=False) for t in titles]
+        recommender.set_model(candidate)
+        actual   = [recommender.get_recommendations(t, top_n, cached=False) for t in titles]
+    finally:
+        recommender.set_model(previous)
+
+    exact, tied, mismatches = 0, 0, []
+    for row, (want, got) in enumerate(zip(expected, actual)):
+        if want == got:
+            exact += 1
+            continue
+        truth = metric.score(state, [row]).toarray().ravel()
+        want_scores = truth[titles.get_indexer(want)]
+        got_scores  = truth[titles.get_indexer(got)]
+        if np.abs(want_scores - got_scores).max() <= rank_tolerance:
+            tied += 1
+        else:
+            mismatches.append(titles[row])
+
+    ids    = candidate.neighbors.ids
+    stored = candidate.neighbors.scores[...]
+    truth  = np.empty(stored.shape)
+    for start in range(0, len(ids), BLOCK_SIZE):
+        stop  = start + BLOCK_SIZE
+        block = metric.score(state, slice(start, stop)).toarray()
+        truth[start:stop] = np.take_along_axis(block, np.maximum(ids[start:stop], 0), axis=1)
+    error = float(np.abs(stored - truth)[ids >= 0].max(initial=0))
+
+    return {
+        "exact":           exact / len(titles),
+        "tied":            tied / len(titles),
+        "max_score_error": error,
+        "mismatches":      mismatches,
+        "ok":              not mismatches and error <= SCORE_TOLERANCE,
+    }
+
+
+# ── Entry Point ────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check compact models against the reference.")
+    parser.add_argument("--scores", nargs="+", default=["float16", "int8"], choices=SCORE_DTYPES)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=RANK_TOLERANCE)
+    args = parser.parse_args()
+
+    stored    = recommender.get_model()
+    matrix    = stored.matrix.astype(np.float64)
+    neighbors = build_neighbor_index(matrix, k=stored.neighbors.k)
+    reference = Model(matrix, stored.movie_index, stored.user_ids, neighbors, "reference-float64")
+    ref_bytes = model_nbytes(reference.matrix, reference.neighbors)["total"]
+
+    print(f"{'variant':>10} {'memory':>10} {'saved':>7} {'exact':>7} {'tied':>6} "
+          f"{'max err':>9} {'ok':>4}")
+    print(f"{'float64':>10} {ref_bytes / 2**20:>8.2f}MB {'-':>7} {1:>7.3f} {0:>6.3f} "
+          f"{0:>9.2e} {'yes':>4}")
+
+    failed = False
+    for score_dtype in args.scores:
+        candidate = compact_model(reference, score_dtype)
+        report    = check_ranking(reference, candidate, args.top_n, args.tolerance)
+        nbytes    = model_nbytes(candidate.matrix, candidate.neighbors)["total"]
+        failed   |= not report["ok"]
+        print(
+            f"{score_dtype:>10} {nbytes / 2**20:>8.2f}MB {1 - nbytes / ref_bytes:>7.1%} "
+            f"{report['exact']:>7.3f} {report['tied']:>6.3f} "
+            f"{report['max_score_error']:>9.2e} {'yes' if report['ok'] else 'NO':>4}"
+        )
+        for title in report["mismatches"][:5]:
+            print(f"{'':>10} differs: {title}")
+
+    sys.exit(1 if failed else 0)
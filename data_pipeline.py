@@ -4,45 +4,202 @@ Movie Recommendation System — Item-Based Collaborative Filtering
 Dataset: MovieLens Small (data/movies.csv, data/ratings.csv)
 """
 
+from typing import NamedTuple
+
 import pandas as pd
 import numpy as np
-from scipy.sparse import csr_matrix
+from scipy.sparse import coo_matrix, csr_matrix
+
+from ingest import (
+    CHUNK_SIZE,
+    MOVIES_COLUMNS,
+    RATINGS_COLUMNS,
+    iter_chunks,
+    load_table,
+)
+from instrumentation import stage
 
 
 # ── Constants ──────────────────────────────────────────────────────────────────
 MIN_MOVIE_RATINGS = 50   # drop movies rated fewer than this many times
 MIN_USER_RATINGS  = 10   # drop users who rated fewer than this many movies
+K_CORE            = False  # repeat the filter until both thresholds hold at once
 DATA_DIR          = "data/"
 
 
 # ── Loaders ────────────────────────────────────────────────────────────────────
 def load_raw_data() -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Load movies and ratings CSVs from disk."""
-    movies  = pd.read_csv(f"{DATA_DIR}movies.csv")
-    ratings = pd.read_csv(f"{DATA_DIR}ratings.csv")
+    """
+    Load movies and ratings from disk.
+
+    Only the columns the pipeline uses are read, already narrowed to
+    int32/float32.  The CSVs are parsed once into a columnar cache under
+    data/.cache/ (see ingest.py) and every later call reads that cache.
+    """
+    movies  = load_table(f"{DATA_DIR}movies.csv", MOVIES_COLUMNS)
+    ratings = load_table(f"{DATA_DIR}ratings.csv", RATINGS_COLUMNS)
     return movies, ratings
 
 
 # ── Noise Filtering ────────────────────────────────────────────────────────────
-def filter_noise(ratings: pd.DataFrame) -> pd.DataFrame:
+class CoreReport(NamedTuple):
+    """How a noise filter converged."""
+
+    rounds    : int         # movie+user passes run
+    removed   : list[int]   # rows removed by each round
+    converged : bool        # True once a round removed nothing (or k_core is off)
+
+
+def core_mask(
+    users: np.ndarray,
+    movies: np.ndarray,
+    min_movie: int = MIN_MOVIE_RATINGS,
+    min_user: int = MIN_USER_RATINGS,
+    max_rounds: int | None = None,
+) -> tuple[np.ndarray, CoreReport]:
+    """
+    Rows that survive the noise filter, as a boolean mask.
+
+    Each round drops the rows of movies with <= min_movie ratings, then the
+    rows of users with <= min_user ratings among the rest.  Dropping users
+    can push movies back under their threshold, so rounds repeat until one
+    removes nothing — the (min_movie+1, min_user+1) k-core, where every
+    remaining movie and user meets its threshold — or max_rounds is reached
+    (max_rounds=1 is the classic single movie pass + user pass).
+
+    Works on the non-negative integer ids directly: counts are bincounts,
+    and every round only scans the rows still alive, so a round costs O(n)
+    and the alive set shrinks from round to round.
+    """
+    alive   = np.arange(len(users))
+    n_movie = int(movies.max(initial=-1)) + 1
+    n_user  = int(users.max(initial=-1)) + 1
+    removed = []
+
+    while max_rounds is None or len(removed) < max_rounds:
+        before = len(alive)
+
+        movie_ok = np.bincount(movies[alive], minlength=n_movie) > min_movie
+        alive    = alive[movie_ok[movies[alive]]]
+        user_ok  = np.bincount(users[alive], minlength=n_user) > min_user
+        alive    = alive[user_ok[users[alive]]]
+
+        removed.append(before - len(alive))
+        if removed[-1] == 0:
+            break
+
+    mask = np.zeros(len(users), dtype=bool)
+    mask[alive] = True
+    return mask, CoreReport(len(removed), removed, removed[-1] == 0 if removed else True)
+
+
+def filter_noise(
+    ratings: pd.DataFrame,
+    k_core: bool = K_CORE,
+    with_report: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, CoreReport]:
     """
     Remove statistical noise by enforcing minimum interaction thresholds.
 
     Keeps only:
       - Movies with > MIN_MOVIE_RATINGS ratings  (removes obscure/cold-start movies)
       - Users  with > MIN_USER_RATINGS  ratings  (removes casual/sparse raters)
+
+    By default this is one movie pass and one user pass, after which a few
+    movies can be back under their threshold.  With k_core=True the passes
+    repeat until both thresholds hold at once (see core_mask).  Either way
+    rows keep their order and each column is masked once, without
+    intermediate DataFrame copies.  with_report=True also returns the
+    CoreReport.
+    """
+    mask, report = core_mask(
+        ratings["userId"].to_numpy(),
+        ratings["movieId"].to_numpy(),
+        max_rounds=None if k_core else 1,
+    )
+    filtered = pd.DataFrame(
+        {name: column.to_numpy()[mask] for name, column in ratings.items()},
+        copy=False,
+    )
+    return (filtered, report) if with_report else filtered
+
+
+# ── Streaming Noise Filter ─────────────────────────────────────────────────────
+def _add_counts(counts: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Add np.bincount(ids) into `counts`, growing it when a larger id shows up."""
+    if len(ids) == 0:
+        return counts
+    chunk_counts = np.bincount(ids)
+    if len(chunk_counts) > len(counts):
+        counts = np.pad(counts, (0, len(chunk_counts) - len(counts)))
+    counts[: len(chunk_counts)] += chunk_counts
+    return counts
+
+
+def stream_filter_noise(
+    csv_path: str | None = None,
+    chunksize: int = CHUNK_SIZE,
+    k_core: bool = K_CORE,
+    with_report: bool = False,
+) -> tuple[pd.DataFrame, int] | tuple[pd.DataFrame, int, CoreReport]:
+    """
+    filter_noise for rating files larger than memory.
+
+    Reads the ratings in chunks of `chunksize` rows and never holds the raw
+    table:
+
+      - Pass 1 counts ratings per movie.
+      - Pass 2 copies the rows of popular movies straight into preallocated
+        int32/float32 arrays (their exact size is known from pass 1) while
+        counting ratings per user, then drops the rows of inactive users.
+
+    With k_core=True any further rounds run in memory on the kept arrays.
+    Peak memory is one chunk plus the movie-filtered ratings.  The result
+    holds the same rows, in the same order, as filter_noise on the full table.
+
+    Returns
+    -------
+    filtered : DataFrame   (userId, movieId, rating)
+    n_raw    : int         Number of ratings read, before filtering.
+    report   : CoreReport  Only with with_report=True.
     """
-    # Step 1 — filter by movie popularity
-    movie_counts   = ratings["movieId"].value_counts()
-    popular_movies = movie_counts[movie_counts > MIN_MOVIE_RATINGS].index
-    ratings        = ratings[ratings["movieId"].isin(popular_movies)]
+    csv_path = csv_path or f"{DATA_DIR}ratings.csv"
+
+    # Pass 1 — movie popularity
+    movie_counts, n_raw = np.zeros(0, dtype=np.int64), 0
+    for chunk in iter_chunks(csv_path, RATINGS_COLUMNS, chunksize):
+        movie_counts = _add_counts(movie_counts, chunk["movieId"].to_numpy())
+        n_raw       += len(chunk)
+
+    popular = movie_counts > MIN_MOVIE_RATINGS
+    kept    = {
+        name: np.empty(int(movie_counts[popular].sum()), dtype=dtype)
+        for name, dtype in RATINGS_COLUMNS.items()
+    }
 
-    # Step 2 — filter by user activity
-    user_counts   = ratings["userId"].value_counts()
-    active_users  = user_counts[user_counts > MIN_USER_RATINGS].index
-    ratings       = ratings[ratings["userId"].isin(active_users)]
+    # Pass 2 — keep popular-movie rows, count user activity among them
+    user_counts, pos = np.zeros(0, dtype=np.int64), 0
+    for chunk in iter_chunks(csv_path, RATINGS_COLUMNS, chunksize):
+        mask = popular[chunk["movieId"].to_numpy()]
+        stop = pos + int(mask.sum())
+        for name, column in kept.items():
+            column[pos:stop] = chunk[name].to_numpy()[mask]
+        user_counts = _add_counts(user_counts, kept["userId"][pos:stop])
+        pos = stop
 
-    return ratings
+    # User activity threshold, applied one column at a time
+    if k_core:
+        # Round 1's movie step removes nothing here (pass 2 already did it)
+        active, report = core_mask(kept["userId"], kept["movieId"])
+    else:
+        active = (user_counts > MIN_USER_RATINGS)[kept["userId"]]
+        report = CoreReport(1, [len(active) - int(active.sum())], True)
+    report.removed[0] += n_raw - pos
+    for name in kept:
+        kept[name] = kept[name][active]
+
+    filtered = pd.DataFrame(kept, copy=False)
+    return (filtered, n_raw, report) if with_report else (filtered, n_raw)
 
 
 # ── Pivot Table ────────────────────────────────────────────────────────────────
@@ -53,6 +210,9 @@ def build_pivot_table(
     """
     Build a Movies × Users pivot table.
 
+    Dense — kept for analysis and notebooks.  The pipeline itself uses
+    build_sparse_matrix, which never materialises this frame.
+
     Rows    → movie titles
     Columns → user IDs
     Values  → star ratings (0 where no rating exists)
@@ -81,31 +241,192 @@ def build_csr_matrix(pivot: pd.DataFrame) -> csr_matrix:
     return csr_matrix(pivot.values)
 
 
-# ── Orchestrator ───────────────────────────────────────────────────────────────
-def build_pipeline() -> tuple[csr_matrix, pd.DataFrame, pd.Index]:
+# ── Direct Sparse Build ────────────────────────────────────────────────────────
+def rating_totals(
+    ratings: pd.DataFrame,
+    movies: pd.DataFrame,
+) -> tuple[csr_matrix, csr_matrix, pd.Index, np.ndarray]:
     """
-    Run the full Phase-1 pipeline and return everything Phase 2 needs.
+    Sum and count the ratings that fall into every (title, user) cell.
+
+    movieId and userId are factorized into integer codes and the ratings are
+    scattered into COO form, so memory stays proportional to the number of
+    ratings rather than movies × users.  Ratings for movies missing from
+    movies.csv are dropped, as the merge in build_pivot_table does.
+
+    Returns
+    -------
+    sums        : CSR matrix  (movies × users) sum of ratings per cell
+    counts      : CSR matrix  same sparsity as `sums`, ratings per cell
+    movie_index : Index       (movie titles aligned with matrix rows, sorted)
+    user_ids    : ndarray     (user IDs aligned with matrix columns, sorted)
+    """
+    # Movie codes → title codes (distinct movieIds can share a title)
+    movie_codes, movie_ids = pd.factorize(ratings["movieId"], sort=True)
+    movie_titles = movies.set_index("movieId")["title"].reindex(movie_ids)
+    title_codes, titles = pd.factorize(movie_titles, sort=True)
+    row = title_codes[movie_codes]
+
+    known  = row >= 0
+    row    = row[known]
+    rating = ratings["rating"].to_numpy()[known]
+    user_codes, user_ids = pd.factorize(ratings["userId"].to_numpy()[known], sort=True)
+
+    shape  = (len(titles), len(user_ids))
+    key    = row.astype(np.int64) * shape[1] + user_codes
+    cells, inverse = np.unique(key, return_inverse=True)
+    coords = (cells // shape[1], cells % shape[1])
+
+    sums   = coo_matrix((np.bincount(inverse, weights=rating), coords), shape=shape).tocsr()
+    counts = coo_matrix((np.bincount(inverse), coords), shape=shape).tocsr()
+
+    return sums, counts, pd.Index(titles, name="title"), np.asarray(user_ids)
+
+
+def build_sparse_matrix(
+    ratings: pd.DataFrame,
+    movies: pd.DataFrame,
+) -> tuple[csr_matrix, pd.Index, np.ndarray]:
+    """
+    Build the Movies × Users CSR matrix straight from the rating columns.
+
+    Same result as build_csr_matrix(build_pivot_table(...)) — rows are movie
+    titles in sorted order, columns are user IDs in sorted order, duplicate
+    (user, title) pairs are averaged — but no dense frame is ever created
+    (see rating_totals).
 
     Returns
     -------
     matrix      : CSR matrix  (movies × users)
-    pivot       : DataFrame   (same data, keeps index/column labels)
     movie_index : Index       (movie titles aligned with matrix rows)
+    user_ids    : ndarray     (user IDs aligned with matrix columns)
+    """
+    sums, counts, movie_index, user_ids = rating_totals(ratings, movies)
+
+    matrix      = sums.copy()
+    matrix.data = sums.data / counts.data
+
+    return matrix, movie_index, user_ids
+
+
+# ── Pipeline Output ────────────────────────────────────────────────────────────
+class RatingMatrix:
+    """
+    Compact output of the Phase-1 pipeline: only what serving needs.
+
+    matrix      : CSR matrix  (movies × users)
+    movie_index : Index       (movie titles aligned with matrix rows)
+    user_ids    : ndarray     (user IDs aligned with matrix columns, sorted)
+
+    Title → row goes through movie_index's hash table and user id → column
+    through a binary search on user_ids, so there is no further mapping to
+    keep.  The dense pivot is never held; to_pivot() rebuilds it on demand
+    for analysis.
+    """
+
+    __slots__ = ("matrix", "movie_index", "user_ids")
+
+    def __init__(self, matrix: csr_matrix, movie_index: pd.Index, user_ids: np.ndarray):
+        self.matrix      = matrix
+        self.movie_index = movie_index
+        self.user_ids    = user_ids
+
+    def __repr__(self) -> str:
+        return f"RatingMatrix(shape={self.matrix.shape}, nnz={self.matrix.nnz:,})"
+
+    def row(self, title: str) -> int:
+        """Matrix row of a movie title (KeyError if it was filtered out)."""
+        return self.movie_index.get_loc(title)
+
+    def col(self, user_id: int) -> int:
+        """Matrix column of a user id (KeyError if it was filtered out)."""
+        col = int(np.searchsorted(self.user_ids, user_id))
+        if col == len(self.user_ids) or self.user_ids[col] != user_id:
+            raise KeyError(user_id)
+        return col
+
+    def to_pivot(self) -> pd.DataFrame:
+        """
+        The dense Movies × Users table (0 where no rating exists), rebuilt
+        from the CSR matrix.  For analysis only — never call it while serving.
+        """
+        return pd.DataFrame(
+            self.matrix.toarray(),
+            index=self.movie_index,
+            columns=pd.Index(self.user_ids, name="userId"),
+        )
+
+    def memory_report(self) -> dict:
+        """
+        Bytes held by each part, and what the dense pivot would have taken.
+
+        Titles are counted as their UTF-8 length plus one object pointer each.
+        """
+        matrix = self.matrix
+        titles = sum(len(t.encode("utf-8")) for t in self.movie_index) + 8 * len(self.movie_index)
+        report = {
+            "matrix":   matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes,
+            "titles":   titles,
+            "user_ids": self.user_ids.nbytes,
+        }
+        report["total"]       = sum(report.values())
+        report["dense_pivot"] = matrix.shape[0] * matrix.shape[1] * 8 + titles + 8 * matrix.shape[1]
+        return report
+
+
+# ── Orchestrator ───────────────────────────────────────────────────────────────
+def build_pipeline(
+    streaming: bool = False,
+    chunksize: int = CHUNK_SIZE,
+    k_core: bool = K_CORE,
+) -> RatingMatrix:
     """
-    movies, ratings = load_raw_data()
+    Run the full Phase-1 pipeline and return everything Phase 2 needs.
+
+    With streaming=True the ratings are filtered chunk by chunk (see
+    stream_filter_noise), for rating files that do not fit in memory.
+    The result is the same either way.  k_core=True repeats the noise
+    filter until it converges (see core_mask).  Each step is reported as a stage
+    to the instrumentation hooks (see instrumentation.py).
 
-    print(f"[raw]      movies={len(movies):,}  ratings={len(ratings):,}")
+    Returns
+    -------
+    RatingMatrix  CSR matrix, movie titles and user ids — no dense pivot.
+    """
+    if streaming:
+        with stage("load_movies") as s:
+            movies = load_table(f"{DATA_DIR}movies.csv", MOVIES_COLUMNS)
+            s.rows = len(movies)
+        with stage("stream_filter_noise") as s:
+            filtered, n_raw, report = stream_filter_noise(
+                chunksize=chunksize, k_core=k_core, with_report=True
+            )
+            s.set(rows=len(filtered), rows_in=n_raw, rounds=report.rounds)
+    else:
+        with stage("load_raw_data") as s:
+            movies, ratings = load_raw_data()
+            s.rows = len(ratings)
+        with stage("filter_noise") as s:
+            filtered, report = filter_noise(ratings, k_core, with_report=True)
+            n_raw = len(ratings)
+            s.set(rows=len(filtered), rows_in=n_raw, rounds=report.rounds)
 
-    filtered = filter_noise(ratings)
+    print(f"[raw]      movies={len(movies):,}  ratings={n_raw:,}")
 
+    print(
+        f"[rounds]   {report.rounds}  removed={', '.join(f'{n:,}' for n in report.removed)}"
+        + ("" if k_core else "  (single pass)")
+    )
     print(
         f"[filtered] ratings={len(filtered):,}  "
         f"unique_movies={filtered['movieId'].nunique():,}  "
         f"unique_users={filtered['userId'].nunique():,}"
     )
 
-    pivot  = build_pivot_table(filtered, movies)
-    matrix = build_csr_matrix(pivot)
+    with stage("build_sparse_matrix") as s:
+        result = RatingMatrix(*build_sparse_matrix(filtered, movies))
+        s.set(rows=result.matrix.shape[0], nnz=result.matrix.nnz)
+    matrix = result.matrix
 
     print(
         f"[matrix]   shape={matrix.shape}  "
@@ -113,12 +434,51 @@ def build_pipeline() -> tuple[csr_matrix, pd.DataFrame, pd.Index]:
         f"sparsity={1 - matrix.nnz / np.prod(matrix.shape):.2%}"
     )
 
-    return matrix, pivot, pivot.index
+    memory = result.memory_report()
+    print(
+        f"[memory]   model={memory['total'] / 2**20:,.2f} MB  "
+        f"dense_pivot={memory['dense_pivot'] / 2**20:,.2f} MB  (not built)"
+    )
+
+    return result
 
 
 # ── Entry Point ────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
-    matrix, pivot, movie_index = build_pipeline()
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Run the Phase-1 data pipeline.")
+    parser.add_argument("--stream", action="store_true",
+                        help="filter ratings chunk by chunk (for files larger than RAM)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--k-core", action="store_true", default=K_CORE,
+                        help="repeat the noise filter until both thresholds hold at once")
+    parser.add_argument("--compare-pivot", action="store_true",
+                        help="also build the dense pivot and report the resident memory it adds")
+    parser.add_argument("--metrics", action="store_true",
+                        help="log per-stage time, memory and row counts (see instrumentation.py)")
+    args = parser.parse_args()
+
+    if args.metrics:
+        import logging
+
+        import instrumentation
+
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        instrumentation.enable(instrumentation.LoggingSink())
+
+    result = build_pipeline(args.stream, args.chunksize, args.k_core)
 
     print("\nSample movie titles in filtered dataset:")
-    print(movie_index[:10].tolist())
\ No newline at end of file
+    print(result.movie_index[:10].tolist())
+
+    if args.compare_pivot:
+        def rss() -> int:
+            with open("/proc/self/statm") as fh:
+                return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+        before = rss()
+        pivot  = result.to_pivot()
+        print(f"\n[memory]   dense pivot {pivot.shape} added "
+              f"{(rss() - before) / 2**20:,.2f} MB resident")
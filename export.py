@@ -0,0 +1,269 @@
+"""
+Static Recommendation Export
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: recommender.py (Phase 2)
+
+Precomputes the top-N recommendations of every movie so the common "more
+like this" request can be answered from static files on a CDN or edge
+cache, without a model server:
+
+    export/<name>/
+        topn.bin               binary: fixed-width ids and scores, title table
+        manifest.json          model version, top_n, shard count, hash
+        shards/shard-0000.json {title: [{"title": …, "score": …}, …], …}
+
+topn.bin is little-endian, every section 8-byte aligned:
+
+    header    magic b"CMTOPN\\0\\0", u32 format, u32 n_movies, u32 top_n,
+              u32 reserved, then u64 byte offsets of the four sections
+    ids       int32   (n_movies, top_n)  row indices, -1 padding
+    scores    float32 (n_movies, top_n)  similarity, NaN padding
+    offsets   uint64  (n_movies + 1)     title i is blob[offsets[i]:offsets[i+1]]
+    blob      UTF-8 titles, in row order
+
+A title lives in JSON shard crc32(utf-8 title) % n_shards, so an edge
+worker can fetch the one shard it needs.  Rows are scored in batches
+through get_recommendations_batch, so the export is linear in the number of
+movies, and everything is written to a scratch directory first and renamed
+into place.
+
+    python export.py --top-n 10 --shards 16 --verify 200
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import recommender
+from ingest import atomic_dir
+from instrumentation import stage
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+EXPORT_DIR     = "export/"
+FORMAT_VERSION = 1
+MAGIC          = b"CMTOPN\0\0"
+HEADER         = struct.Struct("<8sIIII4Q")
+TOP_N          = 10
+N_SHARDS       = 16
+BATCH_SIZE     = 4_096    # movies scored per get_recommendations_batch call
+VERIFY_SAMPLE  = 200
+
+
+# ── Binary Format ──────────────────────────────────────────────────────────────
+class TopNExport(NamedTuple):
+    """Contents of a topn.bin file (arrays are read-only views of the file)."""
+
+    ids    : np.ndarray   # (n_movies, top_n) int32
+    scores : np.ndarray   # (n_movies, top_n) float32
+    titles : pd.Index     # movie titles aligned with rows
+
+    def recommendations(self, title: str) -> list[str]:
+        row = self.titles.get_loc(title)
+        ids = self.ids[row]
+        return self.titles[ids[ids >= 0]].tolist()
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_binary(path: str, ids: np.ndarray, scores: np.ndarray, titles) -> None:
+    """Write a topn.bin file (see the module docstring for the layout)."""
+    encoded = [str(t).encode("utf-8") for t in titles]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    sections = [
+        np.ascontiguousarray(ids, dtype="<i4"),
+        np.ascontiguousarray(scores, dtype="<f4"),
+        offsets,
+        np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    ]
+    starts, position = [], HEADER.size
+    for section in sections:
+        position = _aligned(position)
+        starts.append(position)
+        position += section.nbytes
+
+    with open(path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, FORMAT_VERSION, ids.shape[0], ids.shape[1], 0, *starts))
+        for start, section in zip(starts, sections):
+            fh.write(b"\0" * (start - fh.tell()))
+            fh.write(section.tobytes())
+
+
+def read_binary(path: str) -> TopNExport:
+    """
+    Memory-map a topn.bin file.
+
+    Raises
+    ------
+    ValueError  If the file is not a topn.bin of this FORMAT_VERSION.
+    """
+    raw = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(raw) < HEADER.size:
+        raise ValueError(f"{path} is too short to be a top-N export")
+    magic, version, n_movies, top_n, _, *starts = HEADER.unpack(raw[:HEADER.size].tobytes())
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a format-{FORMAT_VERSION} top-N export")
+
+    ids_at, scores_at, offsets_at, blob_at = starts
+    size    = n_movies * top_n
+    ids     = raw[ids_at:ids_at + 4 * size].view("<i4").reshape(n_movies, top_n)
+    scores  = raw[scores_at:scores_at + 4 * size].view("<f4").reshape(n_movies, top_n)
+    offsets = raw[offsets_at:offsets_at + 8 * (n_movies + 1)].view("<u8")
+    blob    = raw[blob_at:blob_at + int(offsets[-1])].tobytes()
+
+    titles = [
+        blob[start:stop].decode("utf-8")
+        for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+    return TopNExport(ids, scores, pd.Index(titles, name="title"))
+
+
+# ── JSON Shards ────────────────────────────────────────────────────────────────
+def shard_of(title: str, n_shards: int) -> int:
+    """Shard holding `title`: crc32 of its UTF-8 bytes, modulo n_shards."""
+    return zlib.crc32(title.encode("utf-8")) % n_shards
+
+
+def write_shards(directory: str, ids: np.ndarray, scores: np.ndarray, titles, n_shards: int) -> None:
+    """One JSON object per shard, mapping each title to its recommendations."""
+    titles = list(titles)
+    shards = [{} for _ in range(n_shards)]
+    for row, title in enumerate(titles):
+        keep = ids[row] >= 0
+        shards[shard_of(title, n_shards)][title] = [
+            {"title": titles[i], "score": round(s, 6)}
+            for i, s in zip(ids[row][keep].tolist(), scores[row][keep].tolist())
+        ]
+
+    os.makedirs(directory, exist_ok=True)
+    for number, shard in enumerate(shards):
+        with open(os.path.join(directory, f"shard-{number:04d}.json"), "w") as fh:
+            json.dump(shard, fh, ensure_ascii=False, separators=(",", ":"))
+
+
+def read_shard_entry(path: str, title: str) -> list[dict] | None:
+    """Recommendations for `title` from the export at `path`, via its shard."""
+    with open(os.path.join(path, "manifest.json")) as fh:
+        n_shards = json.load(fh)["n_shards"]
+    shard = os.path.join(path, "shards", f"shard-{shard_of(title, n_shards):04d}.json")
+    with open(shard) as fh:
+        return json.load(fh).get(title)
+
+
+# ── Export ─────────────────────────────────────────────────────────────────────
+def compute_top_n(top_n: int = TOP_N, batch_size: int = BATCH_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """Top-N ids and scores of every movie, in batches of row indices."""
+    model    = recommender.get_model()
+    n_movies = len(model.movie_index)
+    depth    = min(top_n, n_movies - 1)
+    ids      = np.empty((n_movies, depth), dtype=np.int32)
+    scores   = np.empty((n_movies, depth), dtype=np.float32)
+
+    for start in range(0, n_movies, batch_size):
+        rows  = np.arange(start, min(start + batch_size, n_movies))
+        batch = recommender.get_recommendations_batch(rows, top_n)
+        ids[rows], scores[rows] = batch.ids, batch.scores
+
+    return ids, scores
+
+
+def export(
+    path: str | None = None,
+    top_n: int = TOP_N,
+    n_shards: int = N_SHARDS,
+    batch_size: int = BATCH_SIZE,
+) -> str:
+    """
+    Write the binary file, JSON shards and manifest for the current model.
+
+    `path` defaults to EXPORT_DIR/model-<version>, and an existing export
+    there is replaced atomically.  Returns the export directory.
+    """
+    model = recommender.get_model()
+    path  = path or os.path.join(EXPORT_DIR, f"model-{model.version}")
+
+    with stage("export_score") as s:
+        ids, scores = compute_top_n(top_n, batch_size)
+        s.rows = len(ids)
+
+    with atomic_dir(path) as scratch, stage("export_write") as s:
+        write_binary(os.path.join(scratch, "topn.bin"), ids, scores, model.movie_index)
+        write_shards(os.path.join(scratch, "shards"), ids, scores, model.movie_index, n_shards)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "model_version":  model.version,
+            "n_movies":       len(ids),
+            "top_n":          ids.shape[1],
+            "n_shards":       n_shards,
+            "shard_hash":     "crc32(utf-8 title) % n_shards",
+            "created":        time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(os.path.join(scratch, "manifest.json"), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        s.rows = len(ids)
+
+    return path
+
+
+# ── Verification ───────────────────────────────────────────────────────────────
+def verify(path: str, sample: int = VERIFY_SAMPLE, seed: int = 0) -> dict:
+    """
+    Compare `sample` random titles of an export with live get_recommendations.
+
+    Both the binary file and the JSON shards are checked against the live
+    (uncached) titles, in order.
+
+    Returns
+    -------
+    dict  checked, mismatches (titles whose export differs) and ok.
+    """
+    exported = read_binary(os.path.join(path, "topn.bin"))
+    top_n    = exported.ids.shape[1]
+    rng      = np.random.default_rng(seed)
+    rows     = rng.choice(len(exported.titles), size=min(sample, len(exported.titles)), replace=False)
+
+    mismatches = []
+    for title in exported.titles[np.sort(rows)]:
+        live    = recommender.get_recommendations(title, top_n, cached=False)
+        binary  = exported.recommendations(title)
+        sharded = [entry["title"] for entry in read_shard_entry(path, title) or []]
+        if not (live == binary == sharded):
+            mismatches.append(title)
+
+    return {"checked": len(rows), "mismatches": mismatches, "ok": not mismatches}
+
+
+# ── Entry Point ────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export every movie's top-N for static serving.")
+    parser.add_argument("--out", default=None, help="export directory (default export/model-<version>)")
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--shards", type=int, default=N_SHARDS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--verify", type=int, default=VERIFY_SAMPLE,
+                        help="titles to check against live recommendations (0 skips)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    path    = export(args.out, args.top_n, args.shards, args.batch_size)
+    size    = os.path.getsize(os.path.join(path, "topn.bin"))
+    print(f"[export]   path={path}  topn.bin={size / 2**20:,.2f} MB  "
+          f"shards={args.shards}  elapsed={time.perf_counter() - started:.2f}s")
+
+    if args.verify:
+        report = verify(path, args.verify)
+        print(f"[verify]   checked={report['checked']}  mismatches={len(report['mismatches'])}")
+        for title in report["mismatches"][:10]:
+            print(f"           differs: {title}")
+        raise SystemExit(0 if report["ok"] else 1)
@@ -0,0 +1,466 @@
+"""
+Incremental Model Updates
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: data_pipeline.py (Phase 1), similarity.py
+
+Folds batches of new (userId, movieId, rating) rows into a live model without
+re-running the pipeline or recomputing every pairwise similarity.
+
+Per batch:
+  1. The noise-filter thresholds are re-checked on the full rating history,
+     since movies and users can cross MIN_MOVIE_RATINGS / MIN_USER_RATINGS
+     (repeated to the k-core when k_core is set, as in build_pipeline).
+  2. If nobody crossed a threshold, the batch is added to the CSR matrix as a
+     sparse delta (per-cell sums and counts, so duplicate ratings are still
+     averaged).  Otherwise the matrix is rebuilt from the ratings and diffed
+     against the old one to find the movies whose vectors actually changed.
+  3. Per-movie norms are refreshed for the changed movies only, and their dot
+     products with every other movie are recomputed.
+  4. Neighbor lists are recomputed from scratch for the changed movies.  Every
+     other list is patched with the fresh scores, and only falls back to a
+     full recompute when a stale entry drops out and the patched list can no
+     longer be proven to be the true top-K.
+
+verify() rebuilds everything from scratch and reports any disagreement.
+The patching relies on plain cosine, so the model always uses the "cosine"
+metric, whatever similarity.METRIC is set to; snapshots record it, so the
+recommender ranks deep (top_n > K) requests with cosine too.
+
+Usage
+-----
+    model  = IncrementalModel.from_data_dir()
+    report = model.add_ratings(new_ratings_df)
+    recommender.set_model(model.snapshot())
+"""
+
+import time
+import uuid
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix, diags
+
+from data_pipeline import (
+    K_CORE,
+    MIN_MOVIE_RATINGS,
+    MIN_USER_RATINGS,
+    build_sparse_matrix,
+    core_mask,
+    filter_noise,
+    load_raw_data,
+    rating_totals,
+)
+from ingest import RATINGS_COLUMNS
+from similarity import (
+    BLOCK_SIZE,
+    TOP_K,
+    NeighborIndex,
+    build_neighbor_index,
+    rank_triplets,
+    top_k_sparse,
+)
+
+
+# ── Update Report ──────────────────────────────────────────────────────────────
+class UpdateReport(NamedTuple):
+    """What a call to IncrementalModel.add_ratings did."""
+
+    ratings_added  : int     # rows in the batch
+    layout_changed : bool    # a movie or user crossed a threshold
+    items_changed  : int     # movies whose rating vector changed
+    rows_patched   : int     # neighbor lists patched with fresh scores
+    rows_rebuilt   : int     # neighbor lists recomputed from scratch
+    seconds        : float
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────────
+def _lookup(table: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """table[ids], with -1 for ids past the end of the table."""
+    out    = np.full(len(ids), -1, dtype=np.int64)
+    inside = ids < len(table)
+    out[inside] = table[ids[inside]]
+    return out
+
+
+def _row_norms(matrix: csr_matrix) -> np.ndarray:
+    """L2 norm of every row."""
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+
+
+def _cell_mean(sums: csr_matrix, counts: csr_matrix) -> csr_matrix:
+    """Per-cell average rating — sums and counts share one sparsity pattern."""
+    matrix      = sums.copy()
+    matrix.data = sums.data / counts.data
+    return matrix
+
+
+# ── Incremental Model ──────────────────────────────────────────────────────────
+class IncrementalModel:
+    """
+    A rating matrix and neighbor index that can absorb new ratings.
+
+    Attributes
+    ----------
+    matrix      : CSR matrix     (movies × users) average rating per cell
+    movie_index : Index          movie titles aligned with matrix rows
+    user_ids    : ndarray        user IDs aligned with matrix columns
+    norms       : ndarray        L2 norm of every matrix row
+    neighbors   : NeighborIndex  top-K most similar movies per movie
+    """
+
+    def __init__(
+        self,
+        ratings: pd.DataFrame,
+        movies: pd.DataFrame,
+        k: int = TOP_K,
+        k_core: bool = K_CORE,
+    ):
+        self._movies    = movies[["movieId", "title"]]
+        self._k         = k
+        self._k_core    = k_core
+        self._n         = 0
+        self._uid       = uuid.uuid4().hex[:12]   # tells instances' versions apart
+        self._raw       = {
+            name: np.empty(0, dtype=dtype) for name, dtype in RATINGS_COLUMNS.items()
+        }
+        self.n_updates  = 0
+
+        self._append(ratings)
+        keep = self._keep_mask()
+        self._set_layout(*rating_totals(self._frame(keep), self._movies))
+        self.norms     = _row_norms(self.matrix)
+        self.neighbors = build_neighbor_index(self.matrix, k=self._k, metric="cosine")
+
+    @classmethod
+    def from_data_dir(cls, k: int = TOP_K, k_core: bool = K_CORE) -> "IncrementalModel":
+        """Start from the ratings and movies in DATA_DIR."""
+        movies, ratings = load_raw_data()
+        return cls(ratings, movies, k, k_core)
+
+    # ── Raw rating history ────────────────────────────────────────────────────
+    def _append(self, batch: pd.DataFrame) -> None:
+        """Append a batch to the raw history, doubling capacity as needed."""
+        missing = set(RATINGS_COLUMNS) - set(batch.columns)
+        if missing:
+            raise ValueError(f"batch is missing columns: {sorted(missing)}")
+
+        stop = self._n + len(batch)
+        for name, dtype in RATINGS_COLUMNS.items():
+            column = self._raw[name]
+            if stop > len(column):
+                grown = np.empty(max(stop, 2 * len(column)), dtype=dtype)
+                grown[: self._n] = column[: self._n]
+                self._raw[name] = column = grown
+            column[self._n : stop] = batch[name].to_numpy(dtype)
+        self._n = stop
+
+    def _frame(self, mask: np.ndarray | None = None) -> pd.DataFrame:
+        columns = {name: column[: self._n] for name, column in self._raw.items()}
+        if mask is not None:
+            columns = {name: column[mask] for name, column in columns.items()}
+        return pd.DataFrame(columns, copy=False)
+
+    def ratings(self) -> pd.DataFrame:
+        """The full raw rating history, including filtered-out rows."""
+        return self._frame()
+
+    def _keep_mask(self) -> np.ndarray:
+        """
+        filter_noise on the raw history, as a boolean mask.
+
+        Two bincounts over integer ids (repeated until they converge with
+        k_core, see core_mask); also records the kept-movie and kept-user
+        masks for the fast path in add_ratings.  A row is kept exactly when
+        both its movie and its user are, in either mode.
+        """
+        users  = self._raw["userId"][: self._n]
+        movies = self._raw["movieId"][: self._n]
+
+        if self._k_core:
+            keep, _ = core_mask(users, movies)
+            self._popular = np.bincount(movies[keep], minlength=movies.max(initial=-1) + 1) > 0
+            self._active  = np.bincount(users[keep], minlength=users.max(initial=-1) + 1) > 0
+            return keep
+
+        self._popular = np.bincount(movies) > MIN_MOVIE_RATINGS
+        on_popular    = self._popular[movies]
+        user_counts   = np.bincount(users[on_popular], minlength=users.max(initial=-1) + 1)
+        self._active  = user_counts > MIN_USER_RATINGS
+
+        return on_popular & self._active[users]
+
+    # ── Layout ────────────────────────────────────────────────────────────────
+    def _set_layout(
+        self,
+        sums: csr_matrix,
+        counts: csr_matrix,
+        movie_index: pd.Index,
+        user_ids: np.ndarray,
+    ) -> None:
+        """Install a new matrix and rebuild the id → row/column lookups."""
+        self._sums, self._counts = sums, counts
+        self.matrix      = _cell_mean(sums, counts)
+        self.movie_index = movie_index
+        self.user_ids    = user_ids
+
+        movie_ids = self._movies["movieId"].to_numpy()
+        self._movie_row = np.full(movie_ids.max(initial=-1) + 1, -1, dtype=np.int64)
+        self._movie_row[movie_ids] = movie_index.get_indexer(self._movies["title"])
+        self._has_title = np.zeros(len(self._movie_row), dtype=np.int64)
+        self._has_title[movie_ids] = 1
+
+        self._user_col = np.full(user_ids.max(initial=-1) + 1, -1, dtype=np.int64)
+        self._user_col[user_ids] = np.arange(len(user_ids))
+
+    # ── Updates ───────────────────────────────────────────────────────────────
+    def add_ratings(self, batch: pd.DataFrame) -> UpdateReport:
+        """
+        Fold a batch of (userId, movieId, rating) rows into the model.
+
+        Returns an UpdateReport describing how much work the update needed.
+        """
+        started = time.perf_counter()
+        popular_before, active_before = self._popular, self._active
+
+        self._append(batch)
+        keep = self._keep_mask()
+
+        b_users  = batch["userId"].to_numpy(np.int64)
+        b_movies = batch["movieId"].to_numpy(np.int64)
+        relevant = (
+            self._popular[b_movies]
+            & self._active[b_users]
+            & (_lookup(self._has_title, b_movies) == 1)
+        )
+        rows     = _lookup(self._movie_row, b_movies[relevant])
+        cols     = _lookup(self._user_col, b_users[relevant])
+
+        same_layout = (
+            np.array_equal(self._popular[: len(popular_before)], popular_before)
+            and not self._popular[len(popular_before):].any()
+            and np.array_equal(self._active[: len(active_before)], active_before)
+            and not self._active[len(active_before):].any()
+            and (rows >= 0).all()
+            and (cols >= 0).all()
+        )
+
+        old_matrix, old_norms, old_neighbors = self.matrix, self.norms, self.neighbors
+
+        if same_layout:
+            # ── Fast path: add the batch as a sparse delta ────────────────────
+            shape = self.matrix.shape
+            ratings = batch["rating"].to_numpy(np.float64)[relevant]
+            self._sums   = self._sums + coo_matrix((ratings, (rows, cols)), shape=shape).tocsr()
+            self._counts = self._counts + coo_matrix(
+                (np.ones(len(rows)), (rows, cols)), shape=shape
+            ).tocsr()
+            self._sums.sum_duplicates()
+            self._counts.sum_duplicates()
+            self.matrix = _cell_mean(self._sums, self._counts)
+
+            row_map = np.arange(shape[0])
+            changed = np.unique(rows)
+        else:
+            # ── Slow path: rebuild the matrix, diff against the old one ───────
+            old_index, old_users = self.movie_index, self.user_ids
+            self._set_layout(*rating_totals(self._frame(keep), self._movies))
+
+            row_map = self.movie_index.get_indexer(old_index)
+            col_map = _lookup(self._user_col, old_users)
+            changed = self._changed_rows(old_matrix, row_map, col_map)
+
+        # ── Norms: carry over unchanged rows, recompute changed ones ──────────
+        self.norms = np.zeros(self.matrix.shape[0])
+        survived   = row_map >= 0
+        self.norms[row_map[survived]] = old_norms[survived]
+        self.norms[changed] = _row_norms(self.matrix[changed])
+
+        patched, rebuilt = self._refresh_neighbors(old_neighbors, row_map, changed)
+
+        self.n_updates += 1
+        return UpdateReport(
+            ratings_added=len(batch),
+            layout_changed=not same_layout,
+            items_changed=len(changed),
+            rows_patched=patched,
+            rows_rebuilt=rebuilt,
+            seconds=time.perf_counter() - started,
+        )
+
+    def _changed_rows(
+        self,
+        old_matrix: csr_matrix,
+        row_map: np.ndarray,
+        col_map: np.ndarray,
+    ) -> np.ndarray:
+        """Rows of the new matrix that are new or differ from their old self."""
+        old   = old_matrix.tocoo()
+        r, c  = row_map[old.row], col_map[old.col]
+        keep  = (r >= 0) & (c >= 0)
+        moved = coo_matrix(
+            (old.data[keep], (r[keep], c[keep])), shape=self.matrix.shape
+        ).tocsr()
+
+        diff = (self.matrix - moved).tocsr()
+        diff.eliminate_zeros()
+
+        changed = np.diff(diff.indptr) > 0
+        entering = np.ones(self.matrix.shape[0], dtype=bool)
+        entering[row_map[row_map >= 0]] = False
+        return np.flatnonzero(changed | entering)
+
+    # ── Neighbor maintenance ──────────────────────────────────────────────────
+    def _normalized(self) -> csr_matrix:
+        """Rows scaled by the maintained norms (zero rows stay zero)."""
+        inverse = np.divide(
+            1.0, self.norms, out=np.zeros_like(self.norms), where=self.norms > 0
+        )
+        return (diags(inverse) @ self.matrix).tocsr()
+
+    def _refresh_neighbors(
+        self,
+        old: NeighborIndex,
+        row_map: np.ndarray,
+        changed: np.ndarray,
+    ) -> tuple[int, int]:
+        """
+        Bring the neighbor index in line with the updated matrix.
+
+        Returns (rows patched, rows rebuilt).
+        """
+        n_rows = self.matrix.shape[0]
+        k      = max(0, min(self._k, n_rows - 1))
+
+        if k != old.k or k == 0:
+            self.neighbors = build_neighbor_index(self.matrix, k=k, metric="cosine")
+            return 0, n_rows
+
+        # Old lists in the new row/column numbering; removed movies become -1
+        prev_ids    = np.full((n_rows, k), -1, dtype=np.int32)
+        prev_scores = np.zeros((n_rows, k), dtype=np.float32)
+        survived    = row_map >= 0
+        old_ids     = old.ids[survived]
+        prev_ids[row_map[survived]]    = np.where(old_ids >= 0, row_map[old_ids], -1)
+        prev_scores[row_map[survived]] = old.scores[survived]
+
+        in_changed = np.zeros(n_rows, dtype=bool)
+        in_changed[changed] = True
+        stale = (prev_ids < 0) | in_changed[np.maximum(prev_ids, 0)]
+
+        # Fresh dot products of every movie with the changed movies
+        normalized = self._normalized()
+        fresh      = (normalized @ normalized[changed].T).tocsr()
+        fresh.eliminate_zeros()
+
+        # A list whose tail is not positive depends on implicit zeros: rebuild
+        rebuild = in_changed.copy()
+        if len(changed) or stale.any():
+            rebuild |= prev_scores[:, k - 1] <= 0
+
+        touched = stale.any(axis=1) | (np.diff(fresh.indptr) > 0)
+        patch   = np.flatnonzero(touched & ~rebuild)
+        n_patched = 0
+
+        if len(patch):
+            # Survivors of each old list + fresh scores against changed movies
+            keep_old        = ~stale[patch]
+            old_r, old_slot = np.nonzero(keep_old)
+            sub             = fresh[patch].tocoo()
+
+            rows = np.concatenate([old_r, sub.row])
+            cols = np.concatenate([prev_ids[patch][old_r, old_slot], changed[sub.col]])
+            vals = np.concatenate([prev_scores[patch][old_r, old_slot], sub.data])
+
+            ids, scores, counts = rank_triplets(rows, cols, vals, len(patch), k)
+
+            # Patched list is exact if nothing fell out, or if its k-th entry
+            # still beats the old k-th entry (which bounded every other movie)
+            old_score = prev_scores[patch, k - 1]
+            old_id    = prev_ids[patch, k - 1]
+            new_score = scores[:, k - 1]
+            new_id    = ids[:, k - 1]
+            bounded   = (new_score > old_score) | (
+                (new_score == old_score) & (old_id >= 0) & (new_id <= old_id)
+            )
+            exact = (counts >= k) & (new_score > 0) & (~stale[patch].any(axis=1) | bounded)
+
+            prev_ids[patch[exact]]    = ids[exact]
+            prev_scores[patch[exact]] = scores[exact]
+            rebuild[patch[~exact]]    = True
+            n_patched = int(exact.sum())
+
+        # Full recompute for changed movies and lists that could not be patched
+        redo = np.flatnonzero(rebuild)
+        if len(redo):
+            normalized_t = normalized.T.tocsr()
+            for start in range(0, len(redo), BLOCK_SIZE):
+                rows_block = redo[start : start + BLOCK_SIZE]
+                block      = normalized[rows_block] @ normalized_t
+                prev_ids[rows_block], prev_scores[rows_block] = top_k_sparse(
+                    block, rows_block, k
+                )
+
+        self.neighbors = NeighborIndex(prev_ids, prev_scores)
+        return n_patched, len(redo)
+
+    # ── Serving / checks ──────────────────────────────────────────────────────
+    def snapshot(self):
+        """
+        The current state as a recommender.Model, ready for set_model().
+
+        Its version names this instance and update, so caches keyed by
+        model version never mix two models' derived structures.
+        """
+        from recommender import Model
+
+        version = f"incremental-{self._uid}-{self.n_updates}"
+        return Model(
+            self.matrix, self.movie_index, self.user_ids, self.neighbors, version, "cosine"
+        )
+
+    def verify(self, atol: float = 1e-5) -> dict:
+        """
+        Compare the incrementally maintained model against a full rebuild.
+
+        Neighbor ids may legitimately differ where two scores tie to within
+        `atol`; any other difference is reported as a mismatch.
+
+        Returns
+        -------
+        dict  with per-component results and an overall "ok" flag.
+        """
+        matrix, movie_index, user_ids = build_sparse_matrix(
+            filter_noise(self.ratings(), k_core=self._k_core), self._movies
+        )
+        neighbors = build_neighbor_index(matrix, k=self._k, metric="cosine")
+
+        same_layout = (
+            matrix.shape == self.matrix.shape
+            and movie_index.equals(self.movie_index)
+            and np.array_equal(user_ids, self.user_ids)
+        )
+        report = {"layout_equal": same_layout, "matrix_max_diff": None, "norms_max_diff": None}
+        if same_layout:
+            report["matrix_max_diff"] = float(abs(matrix - self.matrix).max())
+            report["norms_max_diff"]  = float(np.abs(_row_norms(matrix) - self.norms).max())
+
+        if same_layout and neighbors.ids.shape == self.neighbors.ids.shape:
+            score_diff = np.abs(neighbors.scores - self.neighbors.scores)
+            id_differs = neighbors.ids != self.neighbors.ids
+            report["scores_max_diff"] = float(score_diff.max(initial=0.0))
+            report["id_mismatches"]   = int((id_differs & (score_diff > atol)).sum())
+            report["tie_swaps"]       = int((id_differs & (score_diff <= atol)).sum())
+        else:
+            report["scores_max_diff"] = None
+            report["id_mismatches"]   = None
+
+        report["ok"] = bool(
+            same_layout
+            and report["matrix_max_diff"] <= 1e-9
+            and report["norms_max_diff"] <= atol
+            and report["scores_max_diff"] is not None
+            and report["scores_max_diff"] <= atol
+            and report["id_mismatches"] == 0
+        )
+        return report
@@ -0,0 +1,265 @@
+"""
+Columnar Ingest Cache
+Movie Recommendation System — Item-Based Collaborative Filtering
+Used by: data_pipeline.py (Phase 1)
+
+Parsing ratings.csv is the slowest part of a cold start, and most of that work
+is CSV text parsing into int64/float64 columns we then narrow anyway.  This
+module converts a CSV once into a cache of typed NumPy columns (int32 ids,
+float32 ratings, only the columns the pipeline reads) stored next to the
+source file, and loads that cache on every later run.  The cache is refreshed
+whenever the source file's size or modification time changes.
+
+For files larger than memory, iter_chunks yields fixed-size slices of the same
+typed columns — from the memory-mapped cache when it is fresh, or straight from
+the CSV otherwise — so callers can process the table without ever holding it.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  — enables the multithreaded CSV reader
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+try:
+    import fcntl    # serialises directory swaps (POSIX only)
+except ImportError:
+    fcntl = None
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+CACHE_VERSION = 1
+CACHE_DIRNAME = ".cache"
+
+RATINGS_COLUMNS = {"userId": np.int32, "movieId": np.int32, "rating": np.float32}
+MOVIES_COLUMNS  = {"movieId": np.int32, "title": str}
+CHUNK_SIZE      = 1_000_000   # rows per chunk when streaming
+
+
+# ── String Columns ─────────────────────────────────────────────────────────────
+def save_strings(directory: str, name: str, values) -> None:
+    """
+    Store strings as one UTF-8 byte blob plus an int64 offsets array.
+
+    Both files are plain .npy, so they load without pickle and can be
+    memory-mapped.
+    """
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    np.save(os.path.join(directory, f"{name}.blob.npy"), blob)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+
+
+def load_strings(directory: str, name: str, mmap_mode: str | None = None) -> np.ndarray:
+    """Inverse of save_strings — returns an object array of str."""
+    blob    = np.load(os.path.join(directory, f"{name}.blob.npy"), mmap_mode=mmap_mode)
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode=mmap_mode)
+    raw     = blob.tobytes()
+
+    values = np.empty(len(offsets) - 1, dtype=object)
+    values[:] = [
+        raw[start:stop].decode("utf-8")
+        for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+    return values
+
+
+# ── Atomic Directories ─────────────────────────────────────────────────────────
+@contextmanager
+def atomic_dir(path: str, replace: bool = True) -> Iterator[str]:
+    """
+    Build a directory in scratch space, then move it to `path` by rename.
+
+    Yields the scratch directory, created next to `path` so the rename stays
+    on one filesystem.  It is discarded if the block raises.  When `path`
+    already exists:
+
+      replace=False  `path` is content-addressed (e.g. a model artifact), so
+                     what is already there is kept and the scratch copy is
+                     dropped; processes racing to write it all succeed.
+      replace=True   under an exclusive lock on `<path>.lock`, the old
+                     directory is renamed aside, the new one renamed in and
+                     the old one deleted, so `path` is only missing between
+                     two renames.
+    """
+    parent = os.path.dirname(os.path.normpath(path)) or "."
+    os.makedirs(parent, exist_ok=True)
+    scratch = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    os.chmod(scratch, 0o755)
+
+    try:
+        yield scratch
+        if replace:
+            with _dir_lock(path):
+                _swap_dir(scratch, path)
+        else:
+            try:
+                os.replace(scratch, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+                shutil.rmtree(scratch, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+
+
+@contextmanager
+def _dir_lock(path: str) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.normpath(path) + ".lock", "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        yield
+
+
+def _swap_dir(scratch: str, path: str) -> None:
+    """Rename `scratch` to `path`, moving an existing `path` out of the way."""
+    aside = None
+    if os.path.exists(path):
+        aside = scratch + "-old"    # unique, like the scratch name
+        os.rename(path, aside)
+    os.replace(scratch, path)
+    if aside is not None:
+        shutil.rmtree(aside, ignore_errors=True)
+
+
+# ── Cache Bookkeeping ──────────────────────────────────────────────────────────
+def cache_dir_for(csv_path: str) -> str:
+    """data/ratings.csv  →  data/.cache/ratings"""
+    folder, name = os.path.split(csv_path)
+    return os.path.join(folder, CACHE_DIRNAME, os.path.splitext(name)[0])
+
+
+def _source_stamp(csv_path: str, columns: dict) -> dict:
+    """What the cache must agree with to be considered fresh."""
+    stat = os.stat(csv_path)
+    return {
+        "version": CACHE_VERSION,
+        "size":    stat.st_size,
+        "mtime":   stat.st_mtime_ns,
+        "columns": {name: np.dtype(dtype).name for name, dtype in columns.items()},
+    }
+
+
+def _is_fresh(cache_dir: str, stamp: dict) -> bool:
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path) as fh:
+        return json.load(fh) == stamp
+
+
+# ── Convert / Load ─────────────────────────────────────────────────────────────
+def _csv_dtypes(columns: dict) -> dict:
+    """Column spec → dtype mapping understood by pd.read_csv."""
+    return {name: ("string" if dtype is str else dtype) for name, dtype in columns.items()}
+
+
+def read_csv_typed(csv_path: str, columns: dict) -> pd.DataFrame:
+    """
+    Parse only `columns` from a CSV, straight into their target dtypes.
+
+    Uses the PyArrow reader when it is installed and pandas' C parser
+    otherwise.
+    """
+    return pd.read_csv(
+        csv_path,
+        usecols=list(columns),
+        dtype=_csv_dtypes(columns),
+        engine=CSV_ENGINE,
+    )[list(columns)]
+
+
+def convert_csv(csv_path: str, columns: dict) -> None:
+    """
+    (Re)build the columnar cache for one CSV.
+
+    Columns are written to a scratch directory that is swapped into place
+    once complete (see atomic_dir), so readers never see a partial cache.
+    """
+    cache_dir = cache_dir_for(csv_path)
+    stamp     = _source_stamp(csv_path, columns)
+    frame     = read_csv_typed(csv_path, columns)
+
+    with atomic_dir(cache_dir) as scratch:
+        for name, dtype in columns.items():
+            if dtype is str:
+                save_strings(scratch, name, frame[name].to_numpy())
+            else:
+                np.save(os.path.join(scratch, f"{name}.npy"), frame[name].to_numpy(dtype))
+
+        with open(os.path.join(scratch, "manifest.json"), "w") as fh:
+            json.dump(stamp, fh)
+
+
+def load_table(csv_path: str, columns: dict) -> pd.DataFrame:
+    """
+    Load the typed columns of a CSV, converting it on first use.
+
+    Later calls read the .npy columns directly — no text parsing — so
+    loading is bound by disk bandwidth.
+    """
+    cache_dir = cache_dir_for(csv_path)
+    if not _is_fresh(cache_dir, _source_stamp(csv_path, columns)):
+        convert_csv(csv_path, columns)
+
+    data = {}
+    for name, dtype in columns.items():
+        if dtype is str:
+            data[name] = load_strings(cache_dir, name)
+        else:
+            data[name] = np.load(os.path.join(cache_dir, f"{name}.npy"))
+
+    return pd.DataFrame(data, copy=False)
+
+
+def iter_chunks(
+    csv_path: str,
+    columns: dict,
+    chunksize: int = CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the typed columns of a CSV in frames of at most `chunksize` rows.
+
+    Never loads the whole table: a fresh cache is memory-mapped and sliced,
+    otherwise the CSV is parsed chunk by chunk (the cache is not written,
+    since building it needs the full table in memory).
+    """
+    cache_dir = cache_dir_for(csv_path)
+    numeric   = str not in columns.values()
+
+    if numeric and _is_fresh(cache_dir, _source_stamp(csv_path, columns)):
+        mapped = {
+            name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+            for name in columns
+        }
+        n_rows = len(mapped[next(iter(columns))])
+        for start in range(0, n_rows, chunksize):
+            stop = start + chunksize
+            yield pd.DataFrame({name: np.array(col[start:stop]) for name, col in mapped.items()})
+        return
+
+    reader = pd.read_csv(
+        csv_path,
+        usecols=list(columns),
+        dtype=_csv_dtypes(columns),
+        chunksize=chunksize,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk[list(columns)]
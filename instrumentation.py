@@ -0,0 +1,323 @@
+"""
+Instrumentation
+Movie Recommendation System — Item-Based Collaborative Filtering
+Used by: data_pipeline.py (Phase 1), recommender.py (Phase 2), server.py
+
+Stage and query metrics sent to pluggable sinks:
+
+    with stage("filter_noise") as s:      # wall + CPU time, RSS, peak memory
+        filtered = filter_noise(ratings)
+        s.rows = len(filtered)
+
+    observe("query", seconds, engine="exact")    # latency sample
+    count("cache_hit")                           # counter
+
+Everything is a no-op until enable() is called, so the hooks stay in the
+code paths for good: a disabled stage() costs one flag check.  The server
+enables them at startup and serves the Prometheus sink on /metrics.
+
+Sinks receive one dict per event:
+
+    LoggingSink      one `[metrics] ...` line per event via `logging`
+    JsonLinesSink    one JSON object per line, appended to a file
+    PrometheusSink   aggregates in memory; render() gives the text
+                     exposition format (counters, summaries, histograms)
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+NAMESPACE       = "cinematch"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+_PAGE_SIZE      = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4_096
+
+
+# ── Memory Probes ──────────────────────────────────────────────────────────────
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc; peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of the process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1_024
+
+
+# ── Sinks ──────────────────────────────────────────────────────────────────────
+class LoggingSink:
+    """Log each event as `[metrics] kind=… name=… key=val …`."""
+
+    def __init__(self, logger: logging.Logger | None = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger(NAMESPACE)
+        self.level  = level
+
+    def emit(self, event: dict) -> None:
+        fields = "  ".join(
+            f"{k}={v:.6g}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in event.items() if k != "ts"      # logging stamps its own time
+        )
+        self.logger.log(self.level, "[metrics]  %s", fields)
+
+
+class JsonLinesSink:
+    """Append each event as one JSON line to `path`."""
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._fh   = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def emit(self, event: dict) -> None:
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._fh.write(line + "\n")
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class PrometheusSink:
+    """
+    Aggregate events in memory for a Prometheus scrape.
+
+    stage events  → <ns>_stage_seconds / _cpu_seconds / _rows summaries and
+                    <ns>_stage_*_bytes gauges, labelled by stage
+    observe       → <ns>_<name>_seconds histogram (LATENCY_BUCKETS)
+    count         → <ns>_<name>_total counter
+    """
+
+    def __init__(self, namespace: str = NAMESPACE, buckets=LATENCY_BUCKETS):
+        self.namespace  = namespace
+        self.buckets    = tuple(buckets)
+        self._counters  : dict[tuple, float] = {}
+        self._summaries : dict[tuple, list]  = {}      # key → [count, sum]
+        self._gauges    : dict[tuple, float] = {}
+        self._histos    : dict[tuple, list]  = {}      # key → [bucket counts…, count, sum]
+        self._lock      = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    def emit(self, event: dict) -> None:
+        event  = dict(event)
+        kind   = event.pop("kind")
+        name   = event.pop("name")
+        event.pop("ts", None)
+        with self._lock:
+            if kind == "count":
+                key = self._key(f"{name}_total", event.pop("labels", {}))
+                self._counters[key] = self._counters.get(key, 0) + event["value"]
+            elif kind == "observe":
+                key   = self._key(f"{name}_seconds", event.pop("labels", {}))
+                histo = self._histos.setdefault(key, [0] * (len(self.buckets) + 2))
+                value = event["value"]
+                for i, bound in enumerate(self.buckets):
+                    if value <= bound:
+                        histo[i] += 1
+                histo[-2] += 1
+                histo[-1] += value
+            elif kind == "stage":
+                labels = {"stage": name, **event.pop("labels", {})}
+                for field in ("seconds", "cpu_seconds", "rows"):
+                    if field in event:
+                        summary = self._summaries.setdefault(
+                            self._key(f"stage_{field}", labels), [0, 0.0]
+                        )
+                        summary[0] += 1
+                        summary[1] += event[field]
+                for field in ("rss_bytes", "peak_rss_bytes", "alloc_peak_bytes"):
+                    if field in event:
+                        self._gauges[self._key(f"stage_{field}", labels)] = event[field]
+
+    def render(self) -> str:
+        """The aggregated metrics in the Prometheus text exposition format."""
+        ns    = self.namespace
+        lines = []
+
+        def fmt(labels, extra=()) -> str:
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        def typed(series: dict, kind: str):
+            seen = set()
+            for (name, labels), value in sorted(series.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {ns}_{name} {kind}")
+                    seen.add(name)
+                yield f"{ns}_{name}", labels, value
+
+        with self._lock:
+            for metric, labels, value in typed(self._counters, "counter"):
+                lines.append(f"{metric}{fmt(labels)} {_number(value)}")
+            for metric, labels, value in typed(self._gauges, "gauge"):
+                lines.append(f"{metric}{fmt(labels)} {_number(value)}")
+            for metric, labels, (n, total) in typed(self._summaries, "summary"):
+                lines.append(f"{metric}_count{fmt(labels)} {n}")
+                lines.append(f"{metric}_sum{fmt(labels)} {_number(total)}")
+            for metric, labels, histo in typed(self._histos, "histogram"):
+                for bound, n in zip(self.buckets, histo):
+                    lines.append(f"{metric}_bucket{fmt(labels, [('le', f'{bound:g}')])} {n}")
+                lines.append(f"{metric}_bucket{fmt(labels, [('le', '+Inf')])} {histo[-2]}")
+                lines.append(f"{metric}_count{fmt(labels)} {histo[-2]}")
+                lines.append(f"{metric}_sum{fmt(labels)} {_number(histo[-1])}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# ── Runtime Switch ─────────────────────────────────────────────────────────────
+_enabled      = False
+_trace_memory = False
+_sinks: list  = []
+_sinks_lock   = threading.Lock()
+
+
+def enable(*sinks, trace_memory: bool = False) -> None:
+    """
+    Turn the hooks on, adding `sinks` (a LoggingSink if none are set).
+
+    With trace_memory=True, stages also report the Python allocation peak
+    (tracemalloc); that slows allocation-heavy code noticeably, so it is
+    off by default and stages report RSS only.
+    """
+    global _enabled, _trace_memory
+    with _sinks_lock:
+        _sinks.extend(sinks)
+        if not _sinks:
+            _sinks.append(LoggingSink())
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _trace_memory = trace_memory
+    _enabled      = True
+
+
+def disable() -> None:
+    """Turn the hooks off.  Sinks are kept for the next enable()."""
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def sinks() -> list:
+    return list(_sinks)
+
+
+def remove_sinks() -> None:
+    with _sinks_lock:
+        _sinks.clear()
+
+
+def _emit(event: dict) -> None:
+    event["ts"] = time.time()
+    for sink in _sinks:
+        try:
+            sink.emit(event)
+        except Exception:
+            logging.getLogger(NAMESPACE).exception("metrics sink %r failed", sink)
+
+
+# ── Hooks ──────────────────────────────────────────────────────────────────────
+class Stage:
+    """Extra fields for a running stage: set `.rows` or call `.set(...)`."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self):
+        self.fields: dict = {}
+
+    @property
+    def rows(self):
+        return self.fields.get("rows")
+
+    @rows.setter
+    def rows(self, value) -> None:
+        self.fields["rows"] = int(value)
+
+    def set(self, **fields) -> None:
+        self.fields.update(fields)
+
+
+@contextmanager
+def stage(name: str, **labels) -> Iterator[Stage]:
+    """
+    Time the enclosed block as pipeline stage `name`.
+
+    Emits seconds, cpu_seconds, rss_bytes (after the stage), rss_delta_bytes,
+    peak_rss_bytes (process peak so far), alloc_peak_bytes (the stage's
+    Python allocation peak, with trace_memory only) and whatever the block
+    set on the yielded Stage, e.g. rows.
+    Nothing is measured or emitted while the hooks are disabled.
+    """
+    info = Stage()
+    if not _enabled:
+        yield info
+        return
+
+    tracing = _trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    rss   = rss_bytes()
+    wall  = time.perf_counter()
+    cpu   = time.process_time()
+    yield info
+    seconds = time.perf_counter() - wall
+    cpu     = time.process_time() - cpu
+    after   = rss_bytes()
+    event   = {
+        "kind":            "stage",
+        "name":            name,
+        "seconds":         seconds,
+        "cpu_seconds":     cpu,
+        "rss_bytes":       after,
+        "rss_delta_bytes": after - rss,
+        "peak_rss_bytes":  peak_rss_bytes(),
+        **info.fields,
+    }
+    if tracing:
+        event["alloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    if labels:
+        event["labels"] = labels
+    _emit(event)
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Record one latency sample (e.g. a query) of `seconds`."""
+    if _enabled:
+        _emit({"kind": "observe", "name": name, "value": seconds, "labels": labels})
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Add `value` to counter `name` (e.g. cache hits)."""
+    if _enabled:
+        _emit({"kind": "count", "name": name, "value": value, "labels": labels})
@@ -0,0 +1,218 @@
+"""
+Model Artifact Store
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: data_pipeline.py (Phase 1), ingest.py (string columns)
+
+Persists everything Phase 2 needs to serve a request (CSR matrix, title and
+user indexes, top-K neighbor index) as one versioned directory under MODEL_DIR.
+The directory name carries a hash of the raw CSVs and the build settings, so an
+artifact is reused for as long as its inputs are unchanged and rebuilt as soon
+as any of them move.
+
+Every array is its own uncompressed .npy file (titles as a UTF-8 blob plus
+offsets), so loading memory-maps them read-only instead of reading and
+parsing: startup copies almost nothing, and every process serving the same
+artifact — Streamlit, server workers — shares one page-cache copy.
+
+    models/model-<key>/
+        manifest.json          format version, shape, array dtypes
+        data.npy indices.npy indptr.npy       CSR matrix
+        user_ids.npy
+        neighbor_ids.npy neighbor_scores.npy
+        neighbor_scale.npy     int8 scores only (see similarity.quantize_scores)
+        titles.blob.npy titles.offsets.npy
+
+With COMPACT set, the matrix is stored as float32 and the neighbor scores as
+SCORE_DTYPE (float16, or int8 with a per-row scale); see compact_arrays.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from data_pipeline import DATA_DIR, K_CORE, MIN_MOVIE_RATINGS, MIN_USER_RATINGS
+from ingest import atomic_dir, load_strings, save_strings
+from similarity import METRIC, TOP_K, NeighborIndex, QuantizedScores, get_metric, quantize_scores
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+FORMAT_VERSION = 4          # bump whenever the on-disk layout changes
+MODEL_DIR      = "models/"
+SOURCE_FILES   = ("ratings.csv", "movies.csv")
+HASH_CHUNK     = 1 << 20    # read source files 1 MiB at a time while hashing
+COMPACT        = False      # float32 ratings and quantized neighbor scores
+SCORE_DTYPE    = "int8"     # compact neighbor scores: "float16" or "int8"
+
+
+# ── Artifact Key ───────────────────────────────────────────────────────────────
+def artifact_key() -> str:
+    """
+    Fingerprint every input that shapes the model.
+
+    Covers the artifact format version, the noise-filter thresholds, the
+    neighbor count and similarity metric, the compact settings and the byte
+    contents of the source CSVs.  Any change
+    yields a new key and therefore a new artifact.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"format={FORMAT_VERSION};".encode())
+    digest.update(f"min_movie={MIN_MOVIE_RATINGS};min_user={MIN_USER_RATINGS};".encode())
+    digest.update(f"k_core={K_CORE};".encode())
+    digest.update(f"compact={SCORE_DTYPE if COMPACT else None};".encode())
+    digest.update(f"top_k={TOP_K};metric={get_metric(METRIC)!r};".encode())
+
+    for name in SOURCE_FILES:
+        digest.update(name.encode())
+        with open(f"{DATA_DIR}{name}", "rb") as fh:
+            for chunk in iter(lambda: fh.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(key: str) -> str:
+    """Location of the artifact for a given key."""
+    return os.path.join(MODEL_DIR, f"model-{key}")
+
+
+# ── Compact Mode ───────────────────────────────────────────────────────────────
+def compact_arrays(
+    matrix: csr_matrix,
+    neighbors: NeighborIndex,
+    score_dtype: str = SCORE_DTYPE,
+) -> tuple[csr_matrix, NeighborIndex]:
+    """
+    float32 rating values, int32 CSR indices and quantized neighbor scores.
+
+    Ratings are half stars and their means need far less than float32's
+    precision, so only the scores lose information (see quantize_scores).
+    """
+    matrix = csr_matrix(
+        (matrix.data.astype(np.float32),
+         matrix.indices.astype(np.int32, copy=False),
+         matrix.indptr.astype(np.int32, copy=False)),
+        shape=matrix.shape,
+    )
+    neighbors = NeighborIndex(
+        neighbors.ids.astype(np.int32, copy=False),
+        quantize_scores(neighbors.scores, score_dtype),
+    )
+    return matrix, neighbors
+
+
+def model_nbytes(matrix: csr_matrix, neighbors: NeighborIndex) -> dict:
+    """Bytes held by each part of a model (titles and user ids excluded)."""
+    report = {
+        "matrix":          matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes,
+        "neighbor_ids":    neighbors.ids.nbytes,
+        "neighbor_scores": neighbors.scores.nbytes,
+    }
+    report["total"] = sum(report.values())
+    return report
+
+
+# ── Save / Load ────────────────────────────────────────────────────────────────
+def save_artifact(
+    path: str,
+    matrix: csr_matrix,
+    movie_index: pd.Index,
+    user_ids: np.ndarray,
+    neighbors: NeighborIndex,
+) -> None:
+    """
+    Write the model to the directory `path` atomically.
+
+    The arrays are written to a scratch directory next to the destination
+    and renamed into place, so a concurrent reader never sees a half-written
+    artifact.  `path` is keyed by the artifact's inputs, so if another
+    process got there first its artifact is kept and this one dropped.
+    """
+    arrays = {
+        "data":            matrix.data,
+        "indices":         matrix.indices,
+        "indptr":          matrix.indptr,
+        "user_ids":        np.asarray(user_ids),
+        "neighbor_ids":    neighbors.ids,
+        "neighbor_scores": neighbors.scores,
+    }
+    if isinstance(neighbors.scores, QuantizedScores):
+        arrays["neighbor_scores"] = neighbors.scores.codes
+        if neighbors.scores.scale is not None:
+            arrays["neighbor_scale"] = neighbors.scores.scale
+
+    with atomic_dir(path, replace=False) as scratch:
+        for name, array in arrays.items():
+            np.save(os.path.join(scratch, f"{name}.npy"), np.ascontiguousarray(array))
+        save_strings(scratch, "titles", movie_index)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "shape":          [int(n) for n in matrix.shape],
+            "arrays":         {name: array.dtype.str for name, array in arrays.items()},
+        }
+        with open(os.path.join(scratch, "manifest.json"), "w") as fh:
+            json.dump(manifest, fh)
+
+
+def load_artifact(
+    path: str,
+    mmap: bool = True,
+) -> tuple[csr_matrix, pd.Index, np.ndarray, NeighborIndex]:
+    """
+    Read a model written by save_artifact.
+
+    With mmap=True (the default) every array is a read-only np.memmap over
+    the artifact's files — nothing is copied until a page is touched, and
+    the pages are shared with every other process mapping the same file.
+    Only the titles are decoded into a pandas Index.
+
+    Raises
+    ------
+    ValueError  If `path` is not an artifact directory of this FORMAT_VERSION.
+    """
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.isfile(manifest_path):
+        raise ValueError(f"{path} is not a model artifact directory")
+    with open(manifest_path) as fh:
+        manifest = json.load(fh)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"{path} has format {manifest.get('format_version')}, "
+            f"expected {FORMAT_VERSION}"
+        )
+
+    mode   = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode, allow_pickle=False)
+        for name in manifest["arrays"]
+    }
+
+    matrix = csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=tuple(manifest["shape"]),
+        copy=False,
+    )
+    movie_index = pd.Index(load_strings(path, "titles", mmap_mode=mode), name="title")
+    scores      = arrays["neighbor_scores"]
+    if "neighbor_scale" in arrays or scores.dtype == np.float16:
+        scores  = QuantizedScores(scores, arrays.get("neighbor_scale"))
+    neighbors   = NeighborIndex(arrays["neighbor_ids"], scores)
+
+    return matrix, movie_index, arrays["user_ids"], neighbors
+
+
+def prune_artifacts(keep: str) -> None:
+    """Delete every artifact in MODEL_DIR except `keep` (older .npz files too)."""
+    for path in glob.glob(os.path.join(MODEL_DIR, "model-*")):
+        if os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
@@ -1,66 +1,388 @@
 """
 Phase 2: The Recommendation Engine
 Movie Recommendation System — Item-Based Collaborative Filtering
-Depends on: data_pipeline.py (Phase 1)
+Depends on: data_pipeline.py (Phase 1), similarity.py, model_store.py, ann.py,
+            latent.py, search.py, result_cache.py, instrumentation.py
 """
 
+import os
+import shutil
+import threading
+import time
+from functools import partial
+from typing import NamedTuple
+
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from data_pipeline import build_pipeline
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from ann import LSHIndex
+from data_pipeline import build_pipeline, load_raw_data
+from instrumentation import count, is_enabled, observe, stage
+from latent import LatentFactorIndex
+from model_store import (
+    COMPACT,
+    SCORE_DTYPE,
+    artifact_key,
+    compact_arrays,
+    artifact_path,
+    load_artifact,
+    prune_artifacts,
+    save_artifact,
+)
+from result_cache import CacheStats, ResultCache
+from search import (
+    LIMIT,
+    RESOLVE_LIMIT,
+    SUGGEST_MIN,
+    TitleResolver,
+    TitleSearchIndex,
+)
+from similarity import (
+    BLOCK_SIZE,
+    METRIC,
+    NeighborIndex,
+    build_neighbor_index,
+    get_metric,
+    print_progress,
+    top_k_rows,
+)
+
+
+# ── Model Container ────────────────────────────────────────────────────────────
+class Model(NamedTuple):
+    """Everything needed to serve recommendations."""
+
+    matrix      : csr_matrix     # movies × users
+    movie_index : pd.Index       # movie titles aligned with matrix rows
+    user_ids    : np.ndarray     # user IDs aligned with matrix columns
+    neighbors   : NeighborIndex  # top-K most similar movies per movie
+    version     : str            # artifact key the model was built from
+    metric      : str = METRIC   # similarity the neighbors were ranked by
+
+
+# ── Lazy Model Loading ─────────────────────────────────────────────────────────
+_model: Model | None = None
+_model_lock = threading.Lock()
+
+
+def build_model() -> Model:
+    """
+    Run the full pipeline and similarity build, ignoring any artifact.
+
+    With model_store.COMPACT set, the result is shrunk by compact_arrays.
+    """
+    ratings = build_pipeline()
+    with stage("build_neighbor_index") as s:
+        neighbors = build_neighbor_index(ratings.matrix, progress=print_progress)
+        s.rows = len(neighbors.ids)
+    matrix = ratings.matrix
+    if COMPACT:
+        matrix, neighbors = compact_arrays(matrix, neighbors, SCORE_DTYPE)
+    return Model(
+        matrix, ratings.movie_index, ratings.user_ids, neighbors, artifact_key(), METRIC
+    )
+
+
+def load_model() -> Model:
+    """
+    Load the model from its on-disk artifact, building it first if needed.
+
+    The artifact is keyed by the source data and thresholds (see
+    model_store.artifact_key), so a rebuild only happens when one of them
+    changes.  Stale artifacts are removed after a rebuild.
+
+    The arrays are memory-mapped read-only from the artifact (see
+    model_store.load_artifact), so every process serving the same artifact
+    shares one copy in the page cache.  A freshly built model is re-opened
+    from its artifact for the same reason.
+    """
+    key  = artifact_key()
+    path = artifact_path(key)
+
+    if os.path.exists(path):
+        try:
+            with stage("load_artifact") as s:
+                model  = Model(*load_artifact(path), key)
+                s.rows = len(model.movie_index)
+            return model
+        except (ValueError, OSError):
+            # Unreadable (an older format, a missing or truncated array left
+            # by a crash or an interrupted prune): clear and rebuild
+            shutil.rmtree(path, ignore_errors=True)
+
+    model = build_model()
+    with stage("save_artifact") as s:
+        save_artifact(path, model.matrix, model.movie_index, model.user_ids, model.neighbors)
+        s.rows = len(model.movie_index)
+    prune_artifacts(keep=path)
+    return Model(*load_artifact(path), key)
 
 
-# ── Build the pipeline once at import time ─────────────────────────────────────
-matrix, pivot, movie_index = build_pipeline()
+def get_model() -> Model:
+    """Return the process-wide model, loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model()
+    return _model
 
 
-# ── Similarity Matrix ──────────────────────────────────────────────────────────
-def build_similarity_matrix():
+def set_model(model: Model) -> None:
     """
-    Compute cosine similarity between every pair of movies.
+    Swap in a different model for this process, e.g. an incrementally
+    updated one (see incremental.IncrementalModel.snapshot).
+    """
+    global _model, _metric_cache, _graph_cache, _history_cache
+    global _search_cache, _resolver_cache
+    with _model_lock:
+        _model = model
+    # All keyed by version anyway; dropping them frees the old model's copies.
+    _metric_cache = _graph_cache = _history_cache = None
+    _search_cache = _resolver_cache = None
+    with _engine_lock:
+        _engine_cache.clear()
+    _result_cache.clear()
+
+
+def prepare_derived() -> None:
+    """
+    Build every structure the model derives lazily, now.
+
+    That is the model metric's prepared matrices (top_n deeper than the
+    stored top-K), the profile graph and per-user history matrix, the
+    dropped users' histories and the title resolver.  A server calls this before
+    forking, so its workers share these arrays copy-on-write instead of
+    each building private copies on its first deep, profile or user request.
+    """
+    model = get_model()
+    _metric_state(model)
+    _profile_matrices(model)
+    _raw_histories(model)
+    get_resolver()
+
+
+# ── Fallback Scoring ───────────────────────────────────────────────────────────
+_metric_cache: tuple[str, dict] | None = None
+
+
+def _metric_state(model: Model) -> dict:
+    """The model's metric's prepared matrices, computed once per model version."""
+    global _metric_cache
+    if _metric_cache is None or _metric_cache[0] != model.version:
+        _metric_cache = (model.version, get_metric(model.metric).prepare(model.matrix))
+    return _metric_cache[1]
+
+
+def _score_rows(
+    model: Model,
+    rows: np.ndarray,
+    top_n: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rank neighbors for requests deeper than the stored top-K.
+
+    Scores the requested rows against the whole catalogue on the fly with
+    the metric the model's neighbors were built with (model.metric, so deep
+    and stored lists rank alike) — O(nnz) per row, not n² — one dense
+    block of at most BLOCK_SIZE rows at a time, reduced with a 2-D
+    argpartition.
+    """
+    metric     = get_metric(model.metric)
+    state      = _metric_state(model)
+    top_n      = min(top_n, model.matrix.shape[0] - 1)
+    ids        = np.empty((len(rows), top_n), dtype=np.int32)
+    scores     = np.empty((len(rows), top_n), dtype=np.float32)
+
+    for start in range(0, len(rows), BLOCK_SIZE):
+        stop  = start + BLOCK_SIZE
+        chunk = rows[start:stop]
+        block = metric.score(state, chunk).toarray()
+        block[np.arange(len(chunk)), chunk] = -np.inf
+        ids[start:stop], scores[start:stop] = top_k_rows(block, top_n)
+
+    return ids, scores
+
+
+# ── Alternative Engines ────────────────────────────────────────────────────────
+ENGINE  = "exact"                  # default engine for get_recommendations
+ENGINES = {                        # name → factory built from the rating matrix
+    "lsh": LSHIndex,
+    "svd": partial(LatentFactorIndex, method="svd"),
+    "als": partial(LatentFactorIndex, method="als"),
+}
 
-    - Input  : CSR matrix  (movies × users)
-    - Output : 2-D array   (movies × movies)  values in [0, 1]
+_engine_cache: dict[str, tuple[str, object]] = {}
+_engine_lock = threading.Lock()
 
-    cosine_similarity works directly on sparse matrices — no need to
-    convert to dense first, which keeps memory usage low.
+
+def get_engine(name: str):
+    """
+    Return the named alternative engine for the current model.
+
+    Engines are built lazily, once per model version, from the model's
+    rating matrix, and expose query(row, top_n) -> (ids, scores).
     """
-    return cosine_similarity(matrix)
+    if name not in ENGINES:
+        raise ValueError(f"unknown engine {name!r}; choose from {['exact', *ENGINES]}")
+
+    model = get_model()
+    with _engine_lock:
+        cached = _engine_cache.get(name)
+        if cached is None or cached[0] != model.version:
+            cached = (model.version, ENGINES[name](model.matrix))
+            _engine_cache[name] = cached
+    return cached[1]
+
+
+# ── Result Cache ───────────────────────────────────────────────────────────────
+_result_cache = ResultCache()
+
+
+def configure_cache(max_entries: int, ttl: float | None = None) -> None:
+    """Replace the result cache (max_entries=0 turns caching off)."""
+    global _result_cache
+    _result_cache = ResultCache(max_entries, ttl)
+
+
+def cache_stats() -> CacheStats:
+    """Hit/miss/eviction counters of the get_recommendations cache."""
+    return _result_cache.stats()
 
 
-similarity_matrix = build_similarity_matrix()
+def warm_cache(n_titles: int = 500, top_n: int = 5, engine: str | None = None) -> int:
+    """
+    Precompute get_recommendations for the n_titles most-rated movies.
+
+    Returns the number of titles warmed.
+    """
+    model   = get_model()
+    ratings = np.diff(model.matrix.indptr)
+    popular = np.argsort(-ratings, kind="stable")[:n_titles]
+    for title in model.movie_index[popular]:
+        get_recommendations(title, top_n, engine)
+    return len(popular)
 
 
 # ── Core Recommendation Function ───────────────────────────────────────────────
-def get_recommendations(movie_name: str, top_n: int = 5) -> list[str] | str:
+def _check_top_n(top_n) -> None:
+    """Reject a top_n that is not an integer >= 1 before any lookup uses it."""
+    if isinstance(top_n, bool) or not isinstance(top_n, (int, np.integer)):
+        raise TypeError(f"top_n must be an integer, got {type(top_n).__name__}")
+    if top_n < 1:
+        raise ValueError(f"top_n must be at least 1, got {top_n}")
+
+
+def get_recommendations(
+    movie_name: str,
+    top_n: int = 5,
+    engine: str | None = None,
+    cached: bool = True,
+) -> list[str] | str:
     """
     Return the top-N most similar movies for a given title.
 
     Parameters
     ----------
-    movie_name : str   Exact movie title as it appears in the dataset.
+    movie_name : str   Movie title.  Exact titles are looked up directly;
+                       anything else ("matrix", "Toy Story", "godfathr") is
+                       resolved to its most confident match (see
+                       search.TitleResolver), if confident enough.
     top_n      : int   Number of recommendations to return (default 5).
+    engine     : str   "exact" (default, see ENGINE) or a name in ENGINES.
+    cached     : bool  Use the result cache (default True).
+
+    Results are memoised in an LRU cache keyed by (title, top_n, engine,
+    model version); see configure_cache, cache_stats and warm_cache.  With
+    instrumentation enabled, every call reports its latency ("query") and
+    whether the cache answered it ("cache_hit" / "cache_miss").
 
     Returns
     -------
     list[str]  Titles of the top-N recommended movies.
     str        Friendly error message if the movie is not found.
+
+    Raises
+    ------
+    TypeError   If top_n is not an integer.
+    ValueError  If top_n is below 1.
     """
+    _check_top_n(top_n)
+    if not is_enabled():
+        return _cached_recommend(movie_name, top_n, engine, cached)[0]
+
+    started       = time.perf_counter()
+    result, cache = _cached_recommend(movie_name, top_n, engine, cached)
+    observe("query", time.perf_counter() - started, engine=engine or ENGINE, cache=cache)
+    if cache != "off":
+        count(f"cache_{cache}")
+    if isinstance(result, str):
+        count("query_not_found")
+    return result
+
+
+def _cached_recommend(
+    movie_name: str,
+    top_n: int,
+    engine: str | None,
+    cached: bool,
+) -> tuple[list[str] | str, str]:
+    """get_recommendations, plus how the cache took it: "hit", "miss" or "off"."""
+    if not cached:
+        return _recommend(movie_name, top_n, engine), "off"
+
+    key    = (movie_name, top_n, engine or ENGINE, get_model().version)
+    hit    = _result_cache.get(key)
+    if hit is not None:
+        return list(hit), "hit"
+
+    result = _recommend(movie_name, top_n, engine)
+    if isinstance(result, list):
+        _result_cache.put(key, tuple(result))
+    return result, "miss"
+
+
+def _recommend(
+    movie_name: str,
+    top_n: int = 5,
+    engine: str | None = None,
+) -> list[str] | str:
+    """Uncached get_recommendations."""
+    model       = get_model()
+    movie_index = model.movie_index
+
+    # ── Find the row index of this movie (exact title, else fuzzy match) ──────
+    if movie_name in movie_index:
+        movie_idx = movie_index.get_loc(movie_name)
+    else:
+        movie_idx = get_resolver().best(movie_name)
+
     # ── Guard: movie not in database ───────────────────────────────────────────
-    if movie_name not in movie_index:
+    if movie_idx is None:
+        suggestions = [
+            title for title, confidence in resolve_title(movie_name, limit=3)
+            if confidence >= SUGGEST_MIN
+        ]
+        hint = f"\nDid you mean: {'; '.join(suggestions)}?" if suggestions else ""
         return (
             f"❌ '{movie_name}' was not found in the database.\n"
             f"Tip: Make sure the title matches exactly, including the year — "
-            f"e.g. 'Toy Story (1995)'."
+            f"e.g. 'Toy Story (1995)'.{hint}"
         )
 
-    # ── Find the row index of this movie ──────────────────────────────────────
-    movie_idx = movie_index.get_loc(movie_name)
-
-    # ── Grab its similarity scores against all other movies ───────────────────
-    scores = similarity_matrix[movie_idx]
+    # ── Alternative engine, if one was asked for ──────────────────────────────
+    engine = engine or ENGINE
+    if engine != "exact":
+        similar_indices, _ = get_engine(engine).query(movie_idx, top_n)
+        return movie_index[similar_indices].tolist()
 
-    # ── Sort descending; skip index 0 (the movie itself, score = 1.0) ─────────
-    similar_indices = np.argsort(scores)[::-1][1 : top_n + 1]
+    # ── Read its precomputed neighbors (already sorted, self excluded) ────────
+    neighbors = model.neighbors
+    if top_n <= neighbors.k:
+        similar_indices = neighbors.ids[movie_idx, :top_n]
+    else:
+        similar_indices = _score_rows(model, np.array([movie_idx]), top_n)[0][0]
 
     # ── Map indices back to titles ────────────────────────────────────────────
     recommendations = movie_index[similar_indices].tolist()
@@ -68,10 +390,310 @@ def get_recommendations(movie_name: str, top_n: int = 5) -> list[str] | str:
     return recommendations
 
 
+# ── Batch Recommendations ──────────────────────────────────────────────────────
+class BatchRecommendations(NamedTuple):
+    """
+    Result of get_recommendations_batch, one row per query.
+
+    Rows for unknown queries are filled with id -1 and score NaN.
+    """
+
+    ids     : np.ndarray   # (n_queries, top_n) int32    row indices into movie_index
+    scores  : np.ndarray   # (n_queries, top_n) float32  cosine similarity
+    found   : np.ndarray   # (n_queries,)       bool     False for unknown queries
+    missing : list         # the queries that were not found, in input order
+
+    def titles(self, movie_index: pd.Index | None = None) -> list[list[str] | None]:
+        """Titles for every query (None where the query was not found)."""
+        movie_index = get_model().movie_index if movie_index is None else movie_index
+        return [
+            movie_index[row].tolist() if ok else None
+            for row, ok in zip(self.ids, self.found)
+        ]
+
+
+def get_recommendations_batch(queries, top_n: int = 5) -> BatchRecommendations:
+    """
+    Top-N recommendations for many movies in one vectorised call.
+
+    Parameters
+    ----------
+    queries : sequence of str, or array of int
+              Exact titles, or row indices into the model's movie_index.
+    top_n   : int   Number of recommendations per query (default 5).
+
+    Title lookup is a single Index.get_indexer call.  Requests within the
+    stored top-K are a fancy-indexed slice of the neighbor arrays; deeper
+    requests are scored in blocks and reduced with a 2-D argpartition.
+    A top_n that is not an integer >= 1 raises, as in get_recommendations.
+    """
+    _check_top_n(top_n)
+    started = time.perf_counter()
+    model   = get_model()
+    queries = np.asarray(queries)
+
+    if queries.dtype.kind in "iu":
+        rows  = queries.astype(np.int64)
+        found = (rows >= 0) & (rows < len(model.movie_index))
+    else:
+        rows  = model.movie_index.get_indexer(queries.astype(object))
+        found = rows >= 0
+
+    neighbors = model.neighbors
+    depth     = min(top_n, len(model.movie_index) - 1)
+    ids       = np.full((len(queries), depth), -1, dtype=np.int32)
+    scores    = np.full((len(queries), depth), np.nan, dtype=np.float32)
+
+    hit = rows[found]
+    if depth <= neighbors.k:
+        ids[found]    = neighbors.ids[hit, :depth]
+        scores[found] = neighbors.scores[hit, :depth]
+    elif len(hit):
+        ids[found], scores[found] = _score_rows(model, hit, depth)
+
+    if is_enabled():
+        observe("batch_query", time.perf_counter() - started)
+        count("batch_titles", len(queries))
+    return BatchRecommendations(ids, scores, found, queries[~found].tolist())
+
+
+# ── Profile Recommendations ────────────────────────────────────────────────────
+_graph_cache: tuple[str, csr_matrix, csr_matrix] | None = None
+
+
+def _profile_matrices(model: Model) -> tuple[csr_matrix, csr_matrix]:
+    """
+    Sparse views used for profile scoring, built once per model version.
+
+    graph    : movies × movies, row j holds j's top-K neighbors and scores
+    by_user  : users × movies, the rating matrix transposed (row = history)
+    """
+    global _graph_cache
+    if _graph_cache is None or _graph_cache[0] != model.version:
+        ids, scores = model.neighbors
+        n_movies    = len(model.movie_index)
+        valid       = ids >= 0
+        indptr      = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+        graph       = csr_matrix((scores[valid], ids[valid], indptr), shape=(n_movies, n_movies))
+        _graph_cache = (model.version, graph, model.matrix.T.tocsr())
+    return _graph_cache[1], _graph_cache[2]
+
+
+_history_cache: tuple[str, np.ndarray, csr_matrix] | None = None
+
+
+def _raw_histories(model: Model) -> tuple[np.ndarray, csr_matrix]:
+    """
+    Histories of the users the noise filter dropped, built once per model
+    version from ratings.csv.
+
+    user_ids  : sorted ids of users absent from the model
+    histories : users × movies, each user's mean rating per model title
+    """
+    global _history_cache
+    if _history_cache is None or _history_cache[0] != model.version:
+        movies, ratings = load_raw_data()
+        title_rows = model.movie_index.get_indexer(movies["title"].astype(object))
+        position   = pd.Index(movies["movieId"]).get_indexer(ratings["movieId"])
+        rows       = np.where(position >= 0, title_rows[position], -1)
+        users      = ratings["userId"].to_numpy()
+        keep       = (rows >= 0) & ~np.isin(users, model.user_ids)
+
+        user_ids, cols = np.unique(users[keep], return_inverse=True)
+        shape  = (len(user_ids), len(model.movie_index))
+        coords = (cols, rows[keep])
+        sums   = csr_matrix((ratings["rating"].to_numpy(np.float64)[keep], coords), shape=shape)
+        counts = csr_matrix((np.ones(len(cols)), coords), shape=shape)
+        _history_cache = (model.version, user_ids, sums.multiply(counts.power(-1)).tocsr())
+    return _history_cache[1], _history_cache[2]
+
+
+def _user_row(user_ids: np.ndarray, histories: csr_matrix, user_id: int) -> csr_matrix | None:
+    """`user_id`'s row of `histories` (users sorted by id), or None."""
+    row = np.searchsorted(user_ids, user_id)
+    if row < len(user_ids) and user_ids[row] == user_id:
+        return histories[row]
+    return None
+
+
+class ProfileRecommendations(NamedTuple):
+    """Result of recommend_for_profile / recommend_for_user, best first."""
+
+    ids     : np.ndarray   # (<= top_n,) int32    row indices into movie_index
+    scores  : np.ndarray   # (<= top_n,) float32  aggregated similarity
+    missing : list         # seeds (or the user) that were not found
+
+    def titles(self, movie_index: pd.Index | None = None) -> list[str]:
+        movie_index = get_model().movie_index if movie_index is None else movie_index
+        return movie_index[self.ids].tolist()
+
+
+def recommend_for_profile(
+    liked,
+    weights=None,
+    top_n: int = 5,
+    exclude=None,
+) -> ProfileRecommendations:
+    """
+    Recommend from a set of liked movies ("because you liked these 20 films").
+
+    Parameters
+    ----------
+    liked   : sequence of str, or array of int
+              Seed titles, or row indices into the model's movie_index.
+    weights : sequence of float, optional
+              One weight per seed, e.g. the user's star ratings (default 1).
+    top_n   : int   Number of recommendations (default 5).
+    exclude : array of int, optional
+              Extra row indices never to recommend.  Seeds are always excluded.
+
+    Movie i scores Σ w_j · sim(j, i) over the seeds j that list i among
+    their top-K neighbors.  The profile is a sparse 1 × n vector multiplied
+    into the sparse neighbor graph, so each seed costs O(K) regardless of
+    catalogue size.  Movies reached by no seed are never returned.
+    A top_n that is not an integer >= 1 raises, as in get_recommendations.
+    """
+    _check_top_n(top_n)
+    model = get_model()
+    liked = np.asarray(liked)
+    n     = len(model.movie_index)
+
+    if liked.dtype.kind in "iu":
+        rows  = liked.astype(np.int64)
+        found = (rows >= 0) & (rows < n)
+    else:
+        rows  = model.movie_index.get_indexer(liked.astype(object))
+        found = rows >= 0
+
+    if weights is None:
+        weights = np.ones(len(rows))
+    rows, weights = rows[found], np.asarray(weights, dtype=np.float64)[found]
+    missing = liked[~found].tolist()
+
+    graph, _ = _profile_matrices(model)
+    profile  = csr_matrix((weights, (np.zeros_like(rows), rows)), shape=(1, n))
+    totals   = (profile @ graph).tocsr()
+
+    seen = rows
+    if exclude is not None:
+        seen = np.concatenate([rows, np.asarray(exclude, dtype=np.int64)])
+    keep = ~np.isin(totals.indices, seen)
+    cand, vals = totals.indices[keep], totals.data[keep]
+
+    top_n = min(top_n, len(cand))
+    if top_n == 0:
+        return ProfileRecommendations(
+            np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32), missing
+        )
+
+    best  = np.argpartition(-vals, top_n - 1)[:top_n]
+    order = np.lexsort((cand[best], -vals[best]))
+    return ProfileRecommendations(
+        cand[best][order].astype(np.int32),
+        vals[best][order].astype(np.float32),
+        missing,
+    )
+
+
+def recommend_for_user(
+    user_id: int,
+    top_n: int = 5,
+    center: bool = False,
+) -> ProfileRecommendations:
+    """
+    Recommend for a user from their rating history.
+
+    Every movie the user rated is a seed weighted by its rating (minus the
+    user's mean rating when `center` is set, so disliked movies pull scores
+    down), and is excluded from the results.  Users in the model are read
+    straight from the transposed rating matrix; users dropped by the noise
+    filter from an index of their raw histories (see _raw_histories), so
+    every lookup — unknown ids included — is a binary search.
+    """
+    _check_top_n(top_n)
+    model   = get_model()
+    history = _user_row(model.user_ids, _profile_matrices(model)[1], user_id)
+    if history is None:
+        history = _user_row(*_raw_histories(model), user_id)
+
+    if history is None or history.nnz == 0:
+        return ProfileRecommendations(
+            np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32), [user_id]
+        )
+
+    rows, weights = history.indices, history.data
+    if center:
+        weights = weights - weights.mean()
+
+    return recommend_for_profile(rows, weights, top_n)
+
+
 # ── Helper: list all valid movie titles ───────────────────────────────────────
 def get_all_titles() -> list[str]:
     """Return every movie title in the filtered dataset (sorted A→Z)."""
-    return sorted(movie_index.tolist())
+    return sorted(get_model().movie_index.tolist())
+
+
+# ── Title Search ───────────────────────────────────────────────────────────────
+_search_cache: tuple[str, TitleSearchIndex] | None = None
+
+
+def get_search_index() -> TitleSearchIndex:
+    """
+    Substring/prefix index over the model's titles, built once per model
+    version.  Result ids are row indices into movie_index.
+    """
+    global _search_cache
+    model = get_model()
+    if _search_cache is None or _search_cache[0] != model.version:
+        _search_cache = (model.version, TitleSearchIndex(model.movie_index))
+    return _search_cache[1]
+
+
+_resolver_cache: tuple[str, TitleResolver] | None = None
+
+
+def get_resolver() -> TitleResolver:
+    """
+    Fuzzy title resolver over the model's titles, built once per model
+    version.  Same-named films are tie-broken by rating count.
+    """
+    global _resolver_cache
+    model = get_model()
+    if _resolver_cache is None or _resolver_cache[0] != model.version:
+        popularity      = np.diff(model.matrix.indptr)
+        _resolver_cache = (model.version, TitleResolver(model.movie_index, popularity))
+    return _resolver_cache[1]
+
+
+def resolve_title(query: str, limit: int = RESOLVE_LIMIT) -> list[tuple[str, float]]:
+    """
+    Rank catalogue titles against a free-text query.
+
+    Returns
+    -------
+    list[(title, confidence)]  Best first; confidence 1.0 means the same
+                               title (articles, punctuation and case aside)
+                               and, if the query gave one, the same year.
+    """
+    resolver = get_resolver()
+    result   = resolver.resolve(query, limit)
+    return list(zip(resolver.titles[result.ids].tolist(), result.confidence.tolist()))
+
+
+def search_titles(query: str, limit: int = LIMIT) -> tuple[list[str], int]:
+    """
+    Titles containing `query` (case- and accent-insensitive), best first.
+
+    Returns
+    -------
+    titles : list[str]  At most `limit` matches — exact title, then titles
+                        starting with the query, then shorter titles first.
+    total  : int        Number of matches before the cap.
+    """
+    index  = get_search_index()
+    result = index.search(query, limit)
+    return index.titles[result.ids].tolist(), result.total
 
 
 # ── Quick Test ─────────────────────────────────────────────────────────────────
@@ -79,6 +701,7 @@ if __name__ == "__main__":
     test_movies = [
         "Toy Story (1995)",
         "Fargo (1996)",
+        "matrix",                             # fuzzy title resolution
         "This Movie Does Not Exist (2099)",   # error-handling test
     ]
 
@@ -0,0 +1,108 @@
+"""
+Result Cache
+Movie Recommendation System — Item-Based Collaborative Filtering
+Used by: recommender.py (Phase 2)
+
+A bounded, thread-safe LRU map with an optional time-to-live, for memoising
+recommendation results.  Traffic is heavily skewed toward a few hundred
+popular titles, so a small cache absorbs most calls.  Callers put the model
+version in the key, so a rebuilt model never serves results of the old one.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, NamedTuple
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+MAX_ENTRIES = 4_096
+TTL         = None     # seconds; None keeps entries until evicted
+
+
+# ── Cache ──────────────────────────────────────────────────────────────────────
+class CacheStats(NamedTuple):
+    """Counters since the cache was created (or last reset)."""
+
+    hits        : int
+    misses      : int
+    evictions   : int     # dropped to stay within max_entries
+    expirations : int     # dropped because their TTL had passed
+    size        : int
+    max_entries : int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResultCache:
+    """
+    LRU cache with an optional TTL.
+
+    Parameters
+    ----------
+    max_entries : int           Entries kept before the least recently used
+                                one is evicted (0 disables the cache).
+    ttl         : float | None  Seconds an entry stays valid.
+
+    All operations take one lock; values are computed by the caller outside
+    it, so a slow miss never blocks hits on other keys.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float | None = TTL):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        """The cached value for `key` (now most recently used), or `default`."""
+        with self._lock:
+            entry = self._entries.get(key, self._MISSING)
+            if entry is self._MISSING:
+                self._misses += 1
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses      += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value) -> None:
+        """Store `value`, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                self._hits, self._misses, self._evictions, self._expirations,
+                len(self._entries), self.max_entries,
+            )
@@ -0,0 +1,452 @@
+"""
+Title Search Index
+Movie Recommendation System — Item-Based Collaborative Filtering
+Used by: recommender.py (Phase 2), app.py (Phase 3)
+
+Substring search over movie titles without scanning the catalogue.  Titles
+are normalised once (case-folded, accents stripped, whitespace collapsed) and
+every 1-, 2- and 3-gram of every title is posted to an inverted index:
+
+  - queries of up to 3 characters are answered by one posting list;
+  - longer queries intersect the posting lists of their trigrams, smallest
+    first, and only the surviving candidates are checked with `in`.
+
+A sorted copy of the normalised titles serves prefix lookups by bisection.
+Results are ranked exact match → title prefix → other substring, then by
+shorter title, and capped.
+
+TitleResolver maps free text ("matrix", "Toy Story", "godfathr") to titles:
+keys with years, articles and punctuation stripped, an exact-key dict, and
+trigram postings narrowed by a bounded edit distance — ranked candidates with
+confidence scores, in well under a millisecond per query.
+
+    python search.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import bisect
+import re
+import time
+import unicodedata
+from typing import NamedTuple
+
+import numpy as np
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+GRAM_SIZES = (1, 2, 3)
+LIMIT      = 50      # default cap on returned results
+
+_BASE = 0x110001     # code points + 1, so grams of different lengths never collide
+
+ARTICLES         = ("the", "a", "an", "le", "la", "les", "l'", "il", "el",
+                    "los", "las", "der", "die", "das", "den", "det")
+MAX_EDITS        = 2      # edit-distance bound for typo candidates
+CANDIDATES       = 16     # trigram candidates checked by edit distance
+YEAR_PENALTY     = 0.9    # confidence factor when the query's year differs
+CONTAINED        = 0.8    # confidence when the query is wholly inside a longer title
+RESOLVE_LIMIT    = 5
+RESOLVE_MIN      = 0.75   # confidence needed to accept the best candidate
+SUGGEST_MIN      = 0.5    # confidence needed to offer a "did you mean"
+
+_YEAR     = re.compile(r"\s*\((\d{4})(?:\s*[-–]\s*\d{0,4})?\s*\)\s*$")
+_ALT      = re.compile(r"\s*\([^()]*\)\s*$")
+_TRAILING = re.compile(r",\s*(?:%s)$" % "|".join(re.escape(a) for a in ARTICLES))
+_LEADING  = re.compile(r"^(?:%s)\s+" % "|".join(re.escape(a) for a in ARTICLES if a != "l'"))
+_PUNCT    = re.compile(r"[^\w\s]")
+
+
+# ── Normalisation ──────────────────────────────────────────────────────────────
+def normalize_title(text: str) -> str:
+    """'  Amélie  (2001) '  →  'amelie (2001)'"""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+def _grams(text: str, n: int) -> set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _gram_key(gram: str) -> int:
+    """Pack a 1–3 character gram into one int64 (code points offset by 1)."""
+    key = 0
+    for ch in gram:
+        key = key * _BASE + ord(ch) + 1
+    return key
+
+
+# ── Gram Postings ──────────────────────────────────────────────────────────────
+class GramPostings(NamedTuple):
+    """Inverted index gram → ascending text ids, stored as three flat arrays."""
+
+    keys     : np.ndarray   # (n_grams,)  int64  sorted packed gram keys
+    offsets  : np.ndarray   # (n_grams + 1,) int64  slice bounds into postings
+    postings : np.ndarray   # (n_pairs,)  int32  text ids, grouped by gram
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.offsets.nbytes + self.postings.nbytes
+
+    def get(self, gram: str) -> np.ndarray:
+        """Ids of the texts containing `gram` (empty when it never occurs)."""
+        key = _gram_key(gram)
+        pos = int(np.searchsorted(self.keys, key))
+        if pos == len(self.keys) or self.keys[pos] != key:
+            return self.postings[:0]
+        return self.postings[self.offsets[pos]:self.offsets[pos + 1]]
+
+
+def build_postings(texts: list[str], sizes=GRAM_SIZES) -> GramPostings:
+    """
+    Post every n-gram (n in `sizes`, at most 3) of every text to its id.
+
+    All texts are laid out as one code-point array, so the grams of every
+    length are computed by a few vectorised shifts rather than per-title
+    Python loops.
+    """
+    # Every text's code points in one array, texts separated by 0
+    joined = "\0".join(texts) + "\0"
+    points = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    owner  = np.repeat(np.arange(len(texts), dtype=np.int32), [len(t) + 1 for t in texts])
+
+    # (gram key, text id) for every gram that stays inside one text
+    keys, ids, key = [], [], np.zeros(len(points), dtype=np.int64)
+    for n in range(1, max(sizes) + 1):
+        key = key[:len(points) - n + 1] * _BASE + points[n - 1:] + 1
+        if n not in sizes:
+            continue
+        ok  = (points[n - 1:] != 0) & (owner[n - 1:] == owner[:len(owner) - n + 1])
+        if n > 1:
+            ok &= points[:len(points) - n + 1] != 0
+        keys.append(key[ok])
+        ids.append(owner[:len(owner) - n + 1][ok])
+    keys, ids = np.concatenate(keys), np.concatenate(ids)
+
+    # Sorted by (gram, text), duplicates dropped → postings grouped by gram.
+    # ids ascend within each gram size, so a stable sort on the key suffices.
+    order     = np.argsort(keys, kind="stable")
+    keys, ids = keys[order], ids[order]
+    unique    = np.ones(len(keys), dtype=bool)
+    unique[1:] = (keys[1:] != keys[:-1]) | (ids[1:] != ids[:-1])
+    keys, ids = keys[unique], ids[unique]
+
+    starts = np.flatnonzero(np.diff(keys, prepend=-1))
+    return GramPostings(keys[starts], np.append(starts, len(keys)).astype(np.int64), ids)
+
+
+# ── Search Index ───────────────────────────────────────────────────────────────
+class SearchResult(NamedTuple):
+    """Ranked matches for one query."""
+
+    ids   : np.ndarray   # (<= limit,) int32  positions in the indexed titles, best first
+    total : int          # number of titles matching before the cap
+
+
+class TitleSearchIndex:
+    """
+    Inverted n-gram index over a list of titles.
+
+    Parameters
+    ----------
+    titles : sequence of str  The catalogue; result ids index into it.
+    """
+
+    def __init__(self, titles):
+        self.titles     = np.asarray(list(titles), dtype=object)
+        self.normalized = [normalize_title(t) for t in self.titles]
+
+        self.grams      = build_postings(self.normalized, GRAM_SIZES)
+
+        # Sorted normalised titles for prefix bisection
+        self.sorted_ids  = np.array(
+            sorted(range(len(self.titles)), key=self.normalized.__getitem__), dtype=np.int32
+        )
+        self.sorted_text = [self.normalized[i] for i in self.sorted_ids]
+
+        # Base rank: shorter titles first, then alphabetical
+        alpha_rank = np.empty(len(self.titles), dtype=np.int64)
+        alpha_rank[self.sorted_ids] = np.arange(len(self.titles))
+        lengths    = np.fromiter(map(len, self.normalized), dtype=np.int64, count=len(self.titles))
+        self.base_rank = np.empty(len(self.titles), dtype=np.int64)
+        self.base_rank[np.lexsort((alpha_rank, lengths))] = np.arange(len(self.titles))
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index arrays (excluding the title strings)."""
+        return self.grams.nbytes + self.sorted_ids.nbytes + self.base_rank.nbytes
+
+    def _prefix_range(self, text: str) -> np.ndarray:
+        lo = bisect.bisect_left(self.sorted_text, text)
+        hi = bisect.bisect_left(self.sorted_text, text + "\U0010ffff")
+        return self.sorted_ids[lo:hi]
+
+    def matches(self, query: str) -> np.ndarray:
+        """Ids of every title containing the normalised query, unranked."""
+        text = normalize_title(query)
+        if not text:
+            return np.arange(len(self.titles), dtype=np.int32)
+        if len(text) <= max(GRAM_SIZES):
+            return self.grams.get(text)
+
+        n     = max(GRAM_SIZES)
+        lists = sorted((self.grams.get(g) for g in _grams(text, n)), key=len)
+        cand  = lists[0]
+        for posting in lists[1:]:
+            if len(cand) == 0:
+                break
+            cand = np.intersect1d(cand, posting, assume_unique=True)
+
+        # Trigrams can all occur without the whole query occurring
+        return cand[[text in self.normalized[i] for i in cand.tolist()]].astype(np.int32)
+
+    def prefix(self, query: str, limit: int = LIMIT) -> SearchResult:
+        """Titles starting with the normalised query, in alphabetical order."""
+        ids = self._prefix_range(normalize_title(query))
+        return SearchResult(ids[:limit], len(ids))
+
+    def search(self, query: str, limit: int = LIMIT) -> SearchResult:
+        """
+        Titles containing the query, ranked and capped at `limit`.
+
+        Ranking: exact title, then titles starting with the query, then the
+        rest — shorter titles first within each tier.  An empty query
+        returns the whole catalogue in base order.
+        """
+        text = normalize_title(query)
+        ids  = self.matches(text)
+        if len(ids) == 0:
+            return SearchResult(ids, 0)
+
+        total  = len(ids)
+        tier   = np.where(np.isin(ids, self._prefix_range(text)), 1, 2)
+        exact  = bisect.bisect_left(self.sorted_text, text)
+        if text and exact < len(self.sorted_text) and self.sorted_text[exact] == text:
+            tier[ids == self.sorted_ids[exact]] = 0
+
+        key = tier * len(self.titles) + self.base_rank[ids]
+        if total > limit:
+            keep = np.argpartition(key, limit - 1)[:limit]
+            ids, key = ids[keep], key[keep]
+        return SearchResult(ids[np.argsort(key, kind="stable")].astype(np.int32), total)
+
+
+# ── Title Resolution ───────────────────────────────────────────────────────────
+def title_key(title: str) -> tuple[str, int]:
+    """
+    Reduce a title (or a free-text query) to a comparison key and its year.
+
+    'Matrix, The (1999)'  →  ('matrix', 1999)
+    'the matrix'          →  ('matrix', 0)
+    "Amelie (Fabuleux destin d'Amélie Poulain, Le) (2001)"  →  ('amelie', 2001)
+
+    The year and any trailing alternate titles are stripped, articles are
+    dropped from either end, punctuation is removed.
+    """
+    text  = normalize_title(title)
+    match = _YEAR.search(text)
+    year  = int(match.group(1)) if match else 0
+    if match:
+        text = text[:match.start()]
+
+    stripped = _ALT.sub("", text)
+    while stripped and stripped != text:
+        text, stripped = stripped, _ALT.sub("", stripped)
+
+    text = _TRAILING.sub("", text)
+    text = " ".join(_PUNCT.sub("", text).split())
+    return _LEADING.sub("", text), year
+
+
+def edit_distance(a: str, b: str, max_edits: int = MAX_EDITS) -> int:
+    """
+    Levenshtein distance, or max_edits + 1 as soon as it must exceed the bound.
+
+    Only the diagonal band of width 2 · max_edits + 1 is filled.
+    """
+    if abs(len(a) - len(b)) > max_edits:
+        return max_edits + 1
+    over = max_edits + 1
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        lo, hi = max(1, i - max_edits), min(len(b), i + max_edits)
+        curr   = [i if lo == 1 else over] + [over] * len(b)
+        for j in range(lo, hi + 1):
+            curr[j] = min(
+                prev[j] + 1,
+                curr[j - 1] + 1,
+                prev[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+        if min(curr[lo - 1:hi + 1]) > max_edits:
+            return over
+        prev = curr
+    return min(prev[len(b)], over)
+
+
+class Resolution(NamedTuple):
+    """Ranked candidate titles for a free-text query."""
+
+    ids        : np.ndarray   # (<= limit,) int32    positions in the indexed titles
+    confidence : np.ndarray   # (<= limit,) float32  1.0 = same title key and year
+
+
+class TitleResolver:
+    """
+    Map free-text queries ("matrix", "Toy Story", "godfathr") to titles.
+
+    Parameters
+    ----------
+    titles     : sequence of str  The catalogue; result ids index into it.
+    popularity : array, optional  Tie-break weight per title (e.g. rating
+                                  count), so the best-known of several
+                                  same-named films comes first.
+
+    Every title is reduced once to a key (see title_key).  A query is
+    resolved by
+
+      1. an exact key lookup (dict);
+      2. trigram overlap with every key, from the posting lists of the
+         query's own trigrams — no loop over the catalogue — scored by
+         the Dice coefficient, or by CONTAINED × the share of the query's
+         trigrams found when that is higher ("star wars" inside every
+         Star Wars title);
+      3. a bounded edit distance against the best CANDIDATES of those, so
+         typos in short titles still score highly.
+
+    Confidence is 1.0 for an exact key match, otherwise the larger of the
+    trigram score and 1 − edits / length, times YEAR_PENALTY when the query
+    names a different year.
+    """
+
+    def __init__(self, titles, popularity=None):
+        self.titles = np.asarray(list(titles), dtype=object)
+        parsed      = [title_key(t) for t in self.titles]
+        self.keys   = [key for key, _ in parsed]
+        self.years  = np.array([year for _, year in parsed], dtype=np.int32)
+        self.popularity = (
+            np.zeros(len(self.titles)) if popularity is None
+            else np.asarray(popularity, dtype=np.float64)
+        )
+
+        self.exact: dict[str, np.ndarray] = {}
+        for row, key in enumerate(self.keys):
+            self.exact.setdefault(key, []).append(row)
+        for key, rows in self.exact.items():
+            rows = np.array(rows, dtype=np.int32)
+            self.exact[key] = rows[np.argsort(-self.popularity[rows], kind="stable")]
+
+        self.grams   = build_postings([f"  {key} " for key in self.keys], sizes=(3,))
+        self.n_grams = np.bincount(self.grams.postings, minlength=len(self.titles))
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def resolve(self, query: str, limit: int = RESOLVE_LIMIT) -> Resolution:
+        """Up to `limit` candidates for `query`, most confident first."""
+        key, year = title_key(query)
+        if not key:
+            return Resolution(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+
+        # Trigram overlap → Dice coefficient for every title sharing a trigram
+        padded = f"  {key} "
+        grams  = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        hits   = [self.grams.get(g) for g in grams]
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        dice   = 2.0 * shared / (len(grams) + self.n_grams[ids])
+        score  = np.maximum(dice, CONTAINED * shared / len(grams))
+
+        if len(ids) > CANDIDATES:
+            keep = np.argpartition(-score, CANDIDATES - 1)[:CANDIDATES]
+            ids, score = ids[keep], score[keep]
+
+        # Bounded edit distance on the short list
+        for i, row in enumerate(ids.tolist()):
+            other = self.keys[row]
+            edits = edit_distance(key, other)
+            if edits <= MAX_EDITS:
+                score[i] = max(score[i], 1.0 - edits / max(len(key), len(other)))
+
+        exact = self.exact.get(key)
+        if exact is not None:
+            ids   = np.concatenate([exact, ids])
+            score = np.concatenate([np.ones(len(exact)), score])
+            ids, first = np.unique(ids, return_index=True)
+            score = score[first]
+
+        if year:
+            score = np.where(self.years[ids] == year, score, score * YEAR_PENALTY)
+
+        order = np.lexsort((ids, -self.popularity[ids], -score))[:limit]
+        return Resolution(ids[order].astype(np.int32), score[order].astype(np.float32))
+
+    def best(self, query: str, min_confidence: float = RESOLVE_MIN) -> int | None:
+        """The single most confident match, or None below `min_confidence`."""
+        result = self.resolve(query, limit=1)
+        if len(result.ids) and result.confidence[0] >= min_confidence:
+            return int(result.ids[0])
+        return None
+
+
+# ── Benchmark ──────────────────────────────────────────────────────────────────
+def synthetic_catalog(titles, size: int, seed: int = 0) -> list[str]:
+    """Grow a catalogue to `size` titles by recombining words of real ones."""
+    rng   = np.random.default_rng(seed)
+    words = np.array(" ".join(titles).split(), dtype=object)
+    extra = [
+        " ".join(rng.choice(words, size=rng.integers(1, 6))) + f" ({rng.integers(1920, 2025)})"
+        for _ in range(max(size - len(titles), 0))
+    ]
+    return (list(titles) + extra)[:size]
+
+
+def benchmark(titles, queries, repeat: int = 20) -> dict:
+    """p50 latency (ms) of index.search vs the linear lower-and-scan."""
+    started = time.perf_counter()
+    index   = TitleSearchIndex(titles)
+    build_s = time.perf_counter() - started
+
+    def timed(fn):
+        samples = []
+        for _ in range(repeat):
+            for q in queries:
+                started = time.perf_counter()
+                fn(q)
+                samples.append((time.perf_counter() - started) * 1e3)
+        return float(np.percentile(samples, 50)), float(np.percentile(samples, 95))
+
+    index_p50, index_p95 = timed(lambda q: index.search(q))
+    scan_p50, scan_p95   = timed(lambda q: [t for t in titles if q in t.lower()])
+    return {
+        "titles":    len(titles),
+        "build_s":   build_s,
+        "index_p50": index_p50,
+        "index_p95": index_p95,
+        "scan_p50":  scan_p50,
+        "scan_p95":  scan_p95,
+    }
+
+
+# ── Entry Point ────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    from recommender import get_all_titles
+
+    parser = argparse.ArgumentParser(description="Title search latency vs catalogue size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", nargs="+",
+                        default=["t", "st", "the", "star", "toy story", "lord of the", "zzz"])
+    args = parser.parse_args()
+
+    real = get_all_titles()
+    print(f"{'titles':>8} {'build':>8} {'index p50':>10} {'index p95':>10} "
+          f"{'scan p50':>9} {'scan p95':>9}")
+    for size in args.sizes:
+        row = benchmark(synthetic_catalog(real, size), args.queries,
+                        repeat=max(1, 20_000 // size))
+        print(
+            f"{row['titles']:>8,} {row['build_s']:>7.2f}s {row['index_p50']:>8.3f}ms "
+            f"{row['index_p95']:>8.3f}ms {row['scan_p50']:>7.3f}ms {row['scan_p95']:>7.3f}ms"
+        )
@@ -0,0 +1,354 @@
+"""
+HTTP Recommendation Service
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: recommender.py (Phase 2)
+
+A headless JSON API on tornado, for callers that are not the Streamlit app:
+
+    GET  /recommend?title=Toy+Story&top_n=5[&engine=lsh]
+    POST /recommend/batch      {"titles": [...], "top_n": 5}  (results follow titles' order)
+    POST /recommend/profile    {"liked": [...], "weights": [...], "top_n": 5}
+    GET  /users/<id>/recommendations?top_n=5[&center=1]
+    GET  /health               liveness, model version and load time
+    GET  /ready                200 once the model is loaded, 503 before
+    GET  /metrics              Prometheus text exposition (this process)
+
+Scoring is CPU-bound, so every handler hands it to a thread pool and the
+event loop only parses requests and writes responses.  The model's arrays are
+memory-mapped from its artifact (see model_store.py), so processes share them
+through the page cache; with --processes > 1 the model and title indexes are
+loaded once in the parent and the workers are forked from it.
+
+Instrumentation (see instrumentation.py) is always on here: model loading
+stages, per-query latency, cache hits and misses and per-route request
+latency are aggregated for /metrics, and --metrics-log also appends every
+event to a JSON-lines file.
+
+    python server.py --port 8000 --processes 4 --threads 8
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.netutil
+import tornado.process
+import tornado.web
+
+import instrumentation
+import recommender
+from instrumentation import JsonLinesSink, PrometheusSink
+from result_cache import MAX_ENTRIES
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+PORT        = 8000
+THREADS     = 4      # scoring threads per process
+MAX_TOP_N   = 100    # cap on top_n accepted from clients
+MAX_BATCH   = 1_000  # cap on titles per batch request
+
+
+# ── Metrics ────────────────────────────────────────────────────────────────────
+_metrics = PrometheusSink()
+
+
+# ── Model Status ───────────────────────────────────────────────────────────────
+_status = {"ready": False, "version": None, "loaded_at": None, "load_seconds": None, "error": None}
+
+
+def load_model(warm: int = 0) -> None:
+    """
+    Load (or build) the model and everything derived from it (see
+    recommender.prepare_derived), and precompute results for the `warm`
+    most-rated titles, recording how long it took.  All of it is then
+    inherited by forked workers, so deep, profile and user requests do
+    not allocate private copies of the matrix in each one.
+    """
+    started = time.perf_counter()
+    try:
+        model = recommender.get_model()
+        recommender.prepare_derived()
+        if warm:
+            recommender.warm_cache(warm)
+    except Exception as exc:
+        _status["error"] = f"{type(exc).__name__}: {exc}"
+        raise
+    _status.update(
+        ready=True,
+        version=model.version,
+        loaded_at=time.time(),
+        load_seconds=round(time.perf_counter() - started, 3),
+        error=None,
+    )
+
+
+# ── Handlers ───────────────────────────────────────────────────────────────────
+class BaseHandler(tornado.web.RequestHandler):
+    """JSON in, JSON out, scoring off the event loop."""
+
+    def initialize(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json")
+
+    def write_json(self, payload, status: int = 200) -> None:
+        self.set_status(status)
+        self.finish(json.dumps(payload))
+
+    def write_error(self, status_code: int, **kwargs):
+        reason = self._reason
+        if "exc_info" in kwargs and isinstance(kwargs["exc_info"][1], tornado.web.HTTPError):
+            reason = kwargs["exc_info"][1].log_message or reason
+        self.finish(json.dumps({"error": reason}))
+
+    def on_finish(self):
+        instrumentation.observe(
+            "http_request", self.request.request_time(),
+            route=type(self).__name__, status=self.get_status(),
+        )
+
+    def run(self, fn, *args):
+        """Run fn(*args) in the scoring pool; await the result."""
+        return asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def require_model(self) -> None:
+        if not _status["ready"]:
+            raise tornado.web.HTTPError(503, "model is still loading")
+
+    def top_n(self, value) -> int:
+        # int() would take a JSON true as 1 and truncate 2.5 to 2
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise tornado.web.HTTPError(400, "top_n must be an integer")
+        try:
+            top_n = int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise tornado.web.HTTPError(400, "top_n must be an integer")
+        if not 1 <= top_n <= MAX_TOP_N:
+            raise tornado.web.HTTPError(400, f"top_n must be between 1 and {MAX_TOP_N}")
+        return top_n
+
+    def json_body(self) -> dict:
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, "request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, "request body must be a JSON object")
+        return body
+
+
+class RecommendHandler(BaseHandler):
+    async def get(self):
+        self.require_model()
+        title  = self.get_query_argument("title", "").strip()
+        top_n  = self.top_n(self.get_query_argument("top_n", "5"))
+        engine = self.get_query_argument("engine", None)
+        if not title:
+            raise tornado.web.HTTPError(400, "missing 'title'")
+
+        try:
+            result = await self.run(recommender.get_recommendations, title, top_n, engine)
+        except ValueError as exc:     # unknown engine
+            raise tornado.web.HTTPError(400, str(exc))
+
+        if isinstance(result, str):
+            self.write_json({"query": title, "error": result}, status=404)
+        else:
+            self.write_json({"query": title, "recommendations": result})
+
+
+class BatchHandler(BaseHandler):
+    async def post(self):
+        self.require_model()
+        body   = self.json_body()
+        titles = body.get("titles")
+        top_n  = self.top_n(body.get("top_n", 5))
+        if not isinstance(titles, list) or not all(isinstance(t, str) for t in titles):
+            raise tornado.web.HTTPError(400, "'titles' must be a list of strings")
+        if len(titles) > MAX_BATCH:
+            raise tornado.web.HTTPError(400, f"at most {MAX_BATCH} titles per batch")
+
+        def score():
+            batch = recommender.get_recommendations_batch(titles, top_n)
+            return [
+                None if recs is None else
+                [{"title": t, "score": round(float(s), 6)} for t, s in zip(recs, scores)]
+                for recs, scores in zip(batch.titles(), batch.scores)
+            ], batch.missing
+
+        results, missing = await self.run(score)
+        self.write_json({
+            "results": [
+                {"title": title, "recommendations": recs}
+                for title, recs in zip(titles, results)
+            ],
+            "missing": missing,
+        })
+
+
+def _profile_payload(result: recommender.ProfileRecommendations) -> dict:
+    return {
+        "recommendations": [
+            {"title": t, "score": round(float(s), 6)}
+            for t, s in zip(result.titles(), result.scores)
+        ],
+        "missing": result.missing,
+    }
+
+
+def _is_number(value) -> bool:
+    """A finite JSON number (booleans excluded)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:     # an integer too large for a float
+        return False
+
+
+class ProfileHandler(BaseHandler):
+    async def post(self):
+        self.require_model()
+        body    = self.json_body()
+        liked   = body.get("liked")
+        weights = body.get("weights")
+        top_n   = self.top_n(body.get("top_n", 5))
+        if not isinstance(liked, list) or not liked or not all(isinstance(t, str) for t in liked):
+            raise tornado.web.HTTPError(400, "'liked' must be a non-empty list of titles")
+        if weights is not None and (
+            not isinstance(weights, list)
+            or len(weights) != len(liked)
+            or not all(_is_number(w) for w in weights)
+        ):
+            raise tornado.web.HTTPError(
+                400, "'weights' must be a list of finite numbers as long as 'liked'"
+            )
+
+        result = await self.run(recommender.recommend_for_profile, liked, weights, top_n)
+        self.write_json(_profile_payload(result))
+
+
+class UserHandler(BaseHandler):
+    async def get(self, user_id: str):
+        self.require_model()
+        top_n  = self.top_n(self.get_query_argument("top_n", "5"))
+        center = self.get_query_argument("center", "0").lower() in ("1", "true", "yes")
+
+        result = await self.run(recommender.recommend_for_user, int(user_id), top_n, center)
+        self.write_json(_profile_payload(result), status=404 if result.missing else 200)
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        cache = recommender.cache_stats()
+        self.write_json({
+            "status": "ok",
+            "pid":    os.getpid(),
+            **_status,
+            "cache":  {**cache._asdict(), "hit_rate": round(cache.hit_rate, 4)},
+        })
+
+
+class MetricsHandler(BaseHandler):
+    def set_default_headers(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+
+    def get(self):
+        cache = recommender.cache_stats()
+        self.finish(
+            _metrics.render()
+            + f"# TYPE {instrumentation.NAMESPACE}_result_cache_entries gauge\n"
+            + f"{instrumentation.NAMESPACE}_result_cache_entries {cache.size}\n"
+        )
+
+    def on_finish(self):
+        pass    # scrapes are not traffic
+
+
+class ReadyHandler(BaseHandler):
+    def get(self):
+        payload = {"ready": _status["ready"], "version": _status["version"]}
+        self.write_json(payload, status=200 if _status["ready"] else 503)
+
+
+# ── Application ────────────────────────────────────────────────────────────────
+def make_app(executor: ThreadPoolExecutor) -> tornado.web.Application:
+    args = {"executor": executor}
+    return tornado.web.Application([
+        (r"/recommend", RecommendHandler, args),
+        (r"/recommend/batch", BatchHandler, args),
+        (r"/recommend/profile", ProfileHandler, args),
+        (r"/users/(\d+)/recommendations", UserHandler, args),
+        (r"/health", HealthHandler, args),
+        (r"/ready", ReadyHandler, args),
+        (r"/metrics", MetricsHandler, args),
+    ])
+
+
+async def _run(sockets, threads: int, warm: int) -> None:
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="score")
+    server   = tornado.web.HTTPServer(make_app(executor))
+    server.add_sockets(sockets)
+
+    if not _status["ready"]:
+        asyncio.get_running_loop().run_in_executor(executor, load_model, warm)
+
+    print(f"[server]   pid={os.getpid()}  threads={threads}  ready={_status['ready']}")
+    await asyncio.Event().wait()
+
+
+def serve(
+    port: int = PORT,
+    address: str = "",
+    processes: int = 1,
+    threads: int = THREADS,
+    warm: int = 0,
+) -> None:
+    """
+    Bind, load the model, optionally fork, and run the event loop.
+
+    Single process: the server starts answering /health at once and the
+    model loads in the background (/ready reports when it is done).
+    Several processes: the model is loaded before forking so every worker
+    shares it; processes=0 means one per CPU.
+
+    Instrumentation is switched on (if it is not already) with the
+    process's Prometheus sink, before anything is loaded.
+    """
+    if _metrics not in instrumentation.sinks():
+        instrumentation.enable(_metrics)
+    sockets = tornado.netutil.bind_sockets(port, address)
+
+    if processes != 1:
+        load_model(warm)
+        tornado.process.fork_processes(processes)
+
+    asyncio.run(_run(sockets, threads, warm))
+
+
+# ── Entry Point ────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recommendations over HTTP.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--address", default="")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes forked after loading the model (0 = one per CPU)")
+    parser.add_argument("--threads", type=int, default=THREADS, help="scoring threads per process")
+    parser.add_argument("--warm", type=int, default=0,
+                        help="precompute results for this many of the most-rated titles")
+    parser.add_argument("--cache-size", type=int, default=MAX_ENTRIES)
+    parser.add_argument("--cache-ttl", type=float, default=None, help="seconds")
+    parser.add_argument("--metrics-log", default=None,
+                        help="also append every metrics event to this JSON-lines file")
+    args = parser.parse_args()
+
+    recommender.configure_cache(args.cache_size, args.cache_ttl)
+    if args.metrics_log:
+        instrumentation.enable(JsonLinesSink(args.metrics_log))
+
+    serve(args.port, args.address, args.processes, args.threads, args.warm)
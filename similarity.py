@@ -0,0 +1,718 @@
+"""
+Item-Item Similarity: Top-K Neighbor Index
+Movie Recommendation System — Item-Based Collaborative Filtering
+Depends on: data_pipeline.py (Phase 1)
+
+Instead of materialising the full movies × movies cosine matrix, keep only the
+K most similar movies for each movie.  The index is built one block of rows at
+a time as a sparse × sparse product, and every block is reduced to its top-K
+straight away, so peak memory follows the block size rather than the catalogue.
+Block results can be checkpointed to disk, letting an interrupted build on a
+large dataset pick up where it stopped, and blocks can be spread over a pool
+of worker processes that share the matrix through memory-mapped files.
+
+The similarity itself is pluggable (METRICS): plain or shrunk cosine,
+adjusted cosine, Pearson with significance shrinkage and binary Jaccard.
+Each one prepares sparse matrices once — mean-centering touches stored
+ratings only — and scores a block as a sparse product, so none of them
+densifies the rating matrix.  METRIC selects the one the model is built with.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, NamedTuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+TOP_K             = 50     # neighbors kept per movie
+BLOCK_SIZE        = 1024   # maximum rows scored per block
+N_JOBS            = 1      # worker processes for the build (-1 → all CPUs)
+BYTES_PER_ENTRY   = 48     # working memory per non-zero of a block product
+                           # (CSR data + index and scipy's product temporaries)
+DENSE_CHUNK_BYTES = 64 << 20  # dense scratch per top-K reduction (top_k_sparse)
+DENSE_CELL_BYTES  = 24     # scratch per cell of a dense chunk: float64 scores,
+                           # their negation and argpartition's int64 indices
+SCORE_DTYPES      = ("float32", "float16", "int8")   # see quantize_scores
+METRIC            = "cosine"  # similarity used by the build (see METRICS)
+SHRINKAGE         = 100.0     # co-rating count at which shrunk scores are halved
+
+
+# ── Neighbor Index ─────────────────────────────────────────────────────────────
+class NeighborIndex(NamedTuple):
+    """
+    Top-K most similar movies for every movie.
+
+    Row i lists the neighbors of movie i, best first, excluding i itself.
+    """
+
+    ids    : np.ndarray   # (n_movies, k) int32    row indices of neighbors
+    scores : np.ndarray   # (n_movies, k) float32  cosine similarity, descending
+                          # (or QuantizedScores, which reads as float32)
+
+    @property
+    def k(self) -> int:
+        return self.ids.shape[1]
+
+
+class QuantizedScores:
+    """
+    Neighbor scores held as float16, or as int8 codes with one float32 scale
+    per row (score ≈ code × scale).
+
+    Indexing dequantizes just the selected entries to float32, so it stands
+    in for the float32 score array wherever NeighborIndex.scores is read.
+    Rounding is monotonic, so every row stays sorted best first.
+    """
+
+    __slots__ = ("codes", "scale")
+
+    def __init__(self, codes: np.ndarray, scale: np.ndarray | None = None):
+        self.codes = codes
+        self.scale = scale
+
+    @property
+    def shape(self) -> tuple:
+        return self.codes.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (0 if self.scale is None else self.scale.nbytes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, key) -> np.ndarray:
+        values = np.asarray(self.codes[key], dtype=np.float32)
+        if self.scale is not None:
+            values = values * np.broadcast_to(self.scale[:, np.newaxis], self.codes.shape)[key]
+        return values
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        values = self[...]
+        return values if dtype is None else values.astype(dtype)
+
+
+def quantize_scores(scores: np.ndarray, dtype: str) -> np.ndarray | QuantizedScores:
+    """
+    Store neighbor scores as "float32" (unchanged), "float16" or "int8".
+
+    int8 scales every row by its largest magnitude, so each row keeps 8 bits
+    of resolution over its own range: the error is at most half a step,
+    max|row| / 254.
+    """
+    if dtype == "float32":
+        return np.asarray(scores, dtype=np.float32)
+    if dtype == "float16":
+        return QuantizedScores(np.asarray(scores, dtype=np.float16))
+    if dtype == "int8":
+        peak  = np.abs(scores).max(axis=1, initial=0).astype(np.float32)
+        scale = np.where(peak > 0, peak / 127, 1).astype(np.float32)
+        codes = np.rint(scores / scale[:, np.newaxis]).astype(np.int8)
+        return QuantizedScores(codes, scale)
+    raise ValueError(f"unknown score dtype {dtype!r}; choose from {SCORE_DTYPES}")
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────────
+def normalize_rows(matrix: csr_matrix) -> csr_matrix:
+    """L2-normalise every row so that a dot product equals cosine similarity."""
+    return normalize(matrix, norm="l2", axis=1, copy=True).tocsr()
+
+
+def top_k_rows(
+    scores: np.ndarray,
+    k: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest entries of every row of a dense 2-D score block.
+
+    Uses argpartition (linear time) and only sorts the k survivors.  Ties are
+    broken by the lower column index so results are deterministic.
+
+    Returns
+    -------
+    ids    : (rows, k) int32    column indices, best first
+    scores : (rows, k) float32  matching scores
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int32), empty.astype(np.float32)
+
+    part      = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_vals = np.take_along_axis(scores, part, axis=1)
+
+    # argpartition picks arbitrary members of a tie at the k-th place: keep
+    # the lowest columns instead
+    kth  = part_vals.min(axis=1)
+    ties = np.flatnonzero(
+        (scores == kth[:, np.newaxis]).sum(axis=1) > (part_vals == kth[:, np.newaxis]).sum(axis=1)
+    )
+    for r in ties:
+        above = np.flatnonzero(scores[r] > kth[r])
+        level = np.flatnonzero(scores[r] == kth[r])[: k - len(above)]
+        part[r] = np.concatenate([above, level])
+        part_vals[r] = scores[r, part[r]]
+
+    order = np.lexsort((part, -part_vals), axis=-1)
+
+    ids  = np.take_along_axis(part, order, axis=1).astype(np.int32)
+    vals = np.take_along_axis(part_vals, order, axis=1).astype(np.float32)
+    return ids, vals
+
+
+def rank_triplets(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    vals: np.ndarray,
+    n_rows: int,
+    k: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Top-k of every row from (row, col, score) triplets, best first.
+
+    One vectorised lexsort orders the triplets by row, then score descending,
+    then column ascending (the same tie-break as top_k_rows).  Rows with
+    fewer than k triplets are padded with id -1 / score 0.
+
+    Returns
+    -------
+    ids    : (n_rows, k) int32
+    scores : (n_rows, k) float32
+    counts : (n_rows,)   number of triplets each row had
+    """
+    ids    = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+
+    order            = np.lexsort((cols, -vals, rows))
+    rows, cols, vals = rows[order], cols[order], vals[order]
+
+    counts = np.bincount(rows, minlength=n_rows)
+    starts = np.cumsum(counts) - counts
+    rank   = np.arange(len(rows)) - starts[rows]
+    keep   = rank < k
+
+    ids[rows[keep], rank[keep]]    = cols[keep]
+    scores[rows[keep], rank[keep]] = vals[keep]
+    return ids, scores, counts
+
+
+def top_k_sparse(
+    block: csr_matrix,
+    row_offset: int | np.ndarray,
+    k: int,
+    chunk_bytes: int = DENSE_CHUNK_BYTES,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a sparse block of similarity rows to the top-k of every row.
+
+    The block is densified a chunk of rows at a time, sized so the chunk
+    and top_k_rows' temporaries (DENSE_CELL_BYTES per cell) fit in
+    `chunk_bytes` (at least one row per chunk).  Every chunk goes through
+    top_k_rows, so each row costs one linear-time argpartition and implicit
+    zeros rank exactly as they would in the full dense matrix.  Results are
+    identical to running top_k_rows on the dense block.
+
+    Parameters
+    ----------
+    block       : CSR matrix  (rows × n_movies) similarity scores
+    row_offset  : int | array Global index of the block's first row, or of
+                              every row, for excluding each movie from its
+                              own neighbors.
+    k           : int         Neighbors per row.
+    chunk_bytes : int         Dense scratch ceiling (default DENSE_CHUNK_BYTES).
+    """
+    n_rows, n_cols = block.shape
+    ids    = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return ids, scores
+
+    if np.ndim(row_offset) == 0:
+        self_cols = np.arange(n_rows) + row_offset
+    else:
+        self_cols = np.asarray(row_offset)
+
+    step = max(1, chunk_bytes // (n_cols * DENSE_CELL_BYTES))
+    for start in range(0, n_rows, step):
+        stop  = min(start + step, n_rows)
+        dense = block[start:stop].toarray()
+        dense[np.arange(stop - start), self_cols[start:stop]] = -np.inf
+        ids[start:stop], scores[start:stop] = top_k_rows(dense, k)
+
+    return ids, scores
+
+
+# ── Similarity Metrics ─────────────────────────────────────────────────────────
+def _center(matrix: csr_matrix, axis: int) -> csr_matrix:
+    """
+    Subtract each column's (axis=0) or row's (axis=1) mean rating from its
+    stored entries only.  Unrated cells stay implicit zeros — "no opinion"
+    rather than "rated the mean" — so the matrix is never densified.
+    """
+    centered = matrix.tocsr().astype(np.float64, copy=True)
+    if axis == 0:
+        owner, n = centered.indices, centered.shape[1]
+    else:
+        owner, n = np.repeat(np.arange(centered.shape[0]), np.diff(centered.indptr)), centered.shape[0]
+    counts = np.bincount(owner, minlength=n)
+    means  = np.bincount(owner, weights=centered.data, minlength=n) / np.maximum(counts, 1)
+    centered.data -= means[owner]
+    return centered
+
+
+def _binary(matrix: csr_matrix) -> csr_matrix:
+    """1.0 wherever a rating is stored (the implicit-feedback view)."""
+    return csr_matrix(
+        (np.ones(matrix.nnz, dtype=np.float64), matrix.indices, matrix.indptr),
+        shape=matrix.shape,
+    )
+
+
+class Cosine:
+    """
+    Cosine similarity of the raw rating rows, optionally shrunk toward zero
+    by the number of co-rating users n:  sim · n / (n + shrinkage).
+
+    Every metric follows the same two-step protocol, so the blocked build,
+    its worker processes and the fallback scorer treat them alike:
+
+      prepare(matrix) → state   dict of CSR matrices / arrays, built once
+      score(state, rows) → CSR  similarity rows for `rows` (slice or indices)
+                                against every movie, kept sparse
+    """
+
+    name = "cosine"
+
+    def __init__(self, shrinkage: float = 0.0):
+        self.shrinkage = shrinkage
+
+    def __repr__(self) -> str:
+        return f"{self.name}(shrinkage={self.shrinkage:g})" if self.shrinkage else self.name
+
+    def _rows(self, matrix: csr_matrix) -> csr_matrix:
+        """The rows whose L2-normalized dot products are the similarity."""
+        return matrix
+
+    def prepare(self, matrix: csr_matrix) -> dict:
+        left  = normalize_rows(self._rows(matrix))
+        state = {"left": left, "right": left.T.tocsr()}
+        if self.shrinkage:
+            state["binary"]   = _binary(matrix)
+            state["binary_t"] = state["binary"].T.tocsr()
+        return state
+
+    def score(self, state: dict, rows) -> csr_matrix:
+        block = state["left"][rows] @ state["right"]
+        if self.shrinkage:
+            counts      = state["binary"][rows] @ state["binary_t"]
+            counts.data = counts.data / (counts.data + self.shrinkage)
+            block       = block.multiply(counts).tocsr()
+        return block
+
+
+class AdjustedCosine(Cosine):
+    """Cosine after subtracting every user's mean rating (rater bias removed)."""
+
+    name = "adjusted_cosine"
+
+    def _rows(self, matrix: csr_matrix) -> csr_matrix:
+        return _center(matrix, axis=0)
+
+
+class Pearson(Cosine):
+    """
+    Pearson correlation between movies: cosine after subtracting every
+    movie's mean rating, shrunk by co-rating counts (significance
+    weighting) so pairs that share only a handful of raters rank lower.
+    """
+
+    name = "pearson"
+
+    def _rows(self, matrix: csr_matrix) -> csr_matrix:
+        return _center(matrix, axis=1)
+
+
+class Jaccard(Cosine):
+    """
+    |raters(a) ∩ raters(b)| / |raters(a) ∪ raters(b)| on the binary
+    rated/not-rated matrix, for implicit data; rating values are ignored.
+    """
+
+    name = "jaccard"
+
+    def __init__(self):
+        super().__init__(shrinkage=0.0)
+
+    def prepare(self, matrix: csr_matrix) -> dict:
+        binary = _binary(matrix)
+        return {"left": binary, "right": binary.T.tocsr(), "sizes": np.diff(binary.indptr)}
+
+    def score(self, state: dict, rows) -> csr_matrix:
+        block = state["left"][rows] @ state["right"]
+        sizes = np.asarray(state["sizes"])
+        own   = np.repeat(sizes[rows], np.diff(block.indptr))
+        block.data = block.data / (own + sizes[block.indices] - block.data)
+        return block
+
+
+METRICS = {                        # name → metric, selected by METRIC
+    "cosine":          Cosine(),
+    "shrunk_cosine":   Cosine(shrinkage=SHRINKAGE),
+    "adjusted_cosine": AdjustedCosine(),
+    "pearson":         Pearson(shrinkage=SHRINKAGE),
+    "jaccard":         Jaccard(),
+}
+
+
+def get_metric(metric) -> Cosine:
+    """A metric from METRICS by name, or a metric object passed through."""
+    if not isinstance(metric, str):
+        return metric
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric {metric!r}; choose from {list(METRICS)}")
+    return METRICS[metric]
+
+
+# ── Block Planning ─────────────────────────────────────────────────────────────
+def plan_blocks(
+    normalized: csr_matrix,
+    normalized_t: csr_matrix,
+    block_size: int = BLOCK_SIZE,
+    max_memory: int | None = None,
+    products: int = 1,
+    scratch: int = 0,
+) -> list[tuple[int, int]]:
+    """
+    Split the rows into [start, stop) blocks for the similarity build.
+
+    Every block has at most `block_size` rows.  When `max_memory` (bytes) is
+    given, blocks are also cut so that the estimated size of their sparse
+    products stays under it.  The estimate is an upper bound on a product's
+    non-zeros: for each rating in a row, the number of movies that user has
+    rated, capped at n_movies per row.  `products` is how many such
+    products a metric holds at once (two with shrinkage: the similarities
+    and the co-rating counts).  `scratch` bytes are reserved from
+    `max_memory` for the dense top-K reduction (see top_k_sparse).  A
+    single row over budget still gets its own block.
+    """
+    n_rows = normalized.shape[0]
+
+    if max_memory is None:
+        return [
+            (start, min(start + block_size, n_rows))
+            for start in range(0, n_rows, block_size)
+        ]
+
+    user_counts = np.diff(normalized_t.indptr)
+    per_entry   = np.concatenate([[0], np.cumsum(user_counts[normalized.indices])])
+    row_cost    = per_entry[normalized.indptr[1:]] - per_entry[normalized.indptr[:-1]]
+    row_cost    = np.minimum(row_cost, n_rows) * BYTES_PER_ENTRY * products
+    cumulative  = np.concatenate([[0], np.cumsum(row_cost)])
+    budget      = max(max_memory - scratch, 0)
+
+    blocks, start = [], 0
+    while start < n_rows:
+        limit = cumulative[start] + budget
+        fits  = np.searchsorted(cumulative, limit, side="right") - 1
+        stop  = min(max(fits, start + 1), start + block_size, n_rows)
+        blocks.append((int(start), int(stop)))
+        start = stop
+
+    return blocks
+
+
+# ── Checkpoints ────────────────────────────────────────────────────────────────
+def _fingerprint(matrix: csr_matrix, k: int, metric: str = METRIC) -> str:
+    """Hash of the input matrix, k and metric, so checkpoints are never mixed up."""
+    digest = hashlib.sha256()
+    digest.update(f"{matrix.shape};{k};{metric};".encode())
+    for array in (matrix.indptr, matrix.indices, matrix.data):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _block_path(checkpoint_dir: str, start: int) -> str:
+    return os.path.join(checkpoint_dir, f"block-{start:09d}.npz")
+
+
+def _open_checkpoints(
+    checkpoint_dir: str,
+    fingerprint: str,
+    blocks: list[tuple[int, int]],
+) -> None:
+    """
+    Prepare `checkpoint_dir` for this build.
+
+    Block files from a build with a different fingerprint or block plan are
+    discarded; matching ones are left in place to be resumed from.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    manifest_path = os.path.join(checkpoint_dir, "manifest.json")
+    manifest      = {"fingerprint": fingerprint, "blocks": blocks}
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as fh:
+            previous = json.load(fh)
+        if previous == json.loads(json.dumps(manifest)):
+            return
+
+    _clear_checkpoints(checkpoint_dir)
+    with open(manifest_path, "w") as fh:
+        json.dump(manifest, fh)
+
+
+def _save_block(path: str, ids: np.ndarray, scores: np.ndarray) -> None:
+    """Write one block atomically, so a crash never leaves a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        np.savez(fh, ids=ids, scores=scores)
+    os.replace(tmp_path, path)
+
+
+def _clear_checkpoints(checkpoint_dir: str) -> None:
+    for path in glob.glob(os.path.join(checkpoint_dir, "block-*.npz")):
+        os.remove(path)
+    manifest_path = os.path.join(checkpoint_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+
+# ── Progress ───────────────────────────────────────────────────────────────────
+def print_progress(rows_done: int, n_rows: int, elapsed: float) -> None:
+    """Default progress reporter, in the same style as the pipeline logs."""
+    print(
+        f"[neighbors] rows={rows_done:,}/{n_rows:,}  "
+        f"({rows_done / max(n_rows, 1):.0%})  elapsed={elapsed:.1f}s"
+    )
+
+
+# ── Parallel Workers ───────────────────────────────────────────────────────────
+_worker_state: dict | None = None
+
+
+def _share_csr(matrix: csr_matrix, directory: str, name: str) -> tuple:
+    """
+    Dump a CSR matrix's arrays as .npy files for workers to memory-map.
+
+    Returns a small picklable spec; see _attach_csr.
+    """
+    for part in ("data", "indices", "indptr"):
+        np.save(os.path.join(directory, f"{name}.{part}.npy"), getattr(matrix, part))
+    return directory, name, matrix.shape
+
+
+def _attach_csr(spec: tuple) -> csr_matrix:
+    """Rebuild a CSR matrix over read-only memory-mapped arrays — no copy."""
+    directory, name, shape = spec
+    data, indices, indptr = (
+        np.load(os.path.join(directory, f"{name}.{part}.npy"), mmap_mode="r")
+        for part in ("data", "indices", "indptr")
+    )
+    return csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def _share_state(state: dict, directory: str) -> dict:
+    """Share every matrix (and array) of a metric's state; see _attach_state."""
+    specs = {}
+    for name, value in state.items():
+        if isinstance(value, csr_matrix):
+            specs[name] = ("csr", _share_csr(value, directory, name))
+        else:
+            path = os.path.join(directory, f"{name}.npy")
+            np.save(path, value)
+            specs[name] = ("array", path)
+    return specs
+
+
+def _attach_state(specs: dict) -> dict:
+    return {
+        name: _attach_csr(spec) if kind == "csr" else np.load(spec, mmap_mode="r")
+        for name, (kind, spec) in specs.items()
+    }
+
+
+def _init_worker(specs: dict) -> None:
+    global _worker_state
+    _worker_state = _attach_state(specs)
+
+
+def _score_shard(
+    start: int,
+    stop: int,
+    k: int,
+    metric: Cosine,
+    chunk_bytes: int,
+) -> tuple[int, np.ndarray, np.ndarray]:
+    """Worker task: top-k for rows [start, stop) of the shared state."""
+    block = metric.score(_worker_state, slice(start, stop))
+    return (start, *top_k_sparse(block, start, k, chunk_bytes))
+
+
+def _resolve_n_jobs(n_jobs: int) -> int:
+    """1 → serial, N → N processes, -1 → one per CPU."""
+    if n_jobs < 0:
+        return os.cpu_count() or 1
+    return max(1, n_jobs)
+
+
+# ── Index Builder ──────────────────────────────────────────────────────────────
+def build_neighbor_index(
+    matrix: csr_matrix,
+    k: int = TOP_K,
+    block_size: int = BLOCK_SIZE,
+    max_memory: int | None = None,
+    checkpoint_dir: str | None = None,
+    progress: Callable[[int, int, float], None] | None = None,
+    n_jobs: int = N_JOBS,
+    metric: str | Cosine = METRIC,
+) -> NeighborIndex:
+    """
+    Build the top-K neighbor index for a movies × users rating matrix.
+
+    Parameters
+    ----------
+    matrix         : CSR matrix  (movies × users)
+    k              : int         Neighbors kept per movie (capped at n_movies - 1).
+    block_size     : int         Maximum rows scored per block.
+    max_memory     : int | None  Working-memory ceiling per block, in bytes,
+                                 top-K reduction included: up to half of it
+                                 goes to the dense chunks (at most
+                                 DENSE_CHUNK_BYTES), the rest to the products.
+    checkpoint_dir : str | None  Save every finished block here and skip blocks
+                                 already saved by an interrupted build.  Cleared
+                                 once the index is complete.
+    progress       : callable    Called as progress(rows_done, n_rows, elapsed)
+                                 after every block (see print_progress).
+    n_jobs         : int         Worker processes; 1 builds in-process, -1 uses
+                                 every CPU.  Workers memory-map the metric's
+                                 prepared matrices instead of receiving
+                                 pickled copies, and return identical
+                                 results to the serial path.
+    metric         : str | Cosine  A name in METRICS (default METRIC) or a
+                                 metric object.  Every metric is computed on
+                                 the sparse matrix, block by block.
+
+    Returns
+    -------
+    NeighborIndex  with int32 ids and float32 scores, each (n_movies, k).
+    """
+    n_movies = matrix.shape[0]
+    k        = max(0, min(k, n_movies - 1))
+    metric   = get_metric(metric)
+    state    = metric.prepare(matrix)
+    chunk    = DENSE_CHUNK_BYTES
+    if max_memory is not None:
+        chunk = min(chunk, max_memory // 2)
+    blocks   = plan_blocks(
+        state["left"], state["right"], block_size, max_memory,
+        products=2 if metric.shrinkage else 1, scratch=chunk,
+    )
+
+    ids    = np.empty((n_movies, k), dtype=np.int32)
+    scores = np.empty((n_movies, k), dtype=np.float32)
+
+    if checkpoint_dir is not None:
+        _open_checkpoints(checkpoint_dir, _fingerprint(matrix, k, repr(metric)), blocks)
+
+    started   = time.perf_counter()
+    rows_done = 0
+    pending   = []
+
+    def finish(start: int, stop: int) -> None:
+        nonlocal rows_done
+        rows_done += stop - start
+        if progress is not None:
+            progress(rows_done, n_movies, time.perf_counter() - started)
+
+    # ── Blocks saved by an interrupted build are loaded, not recomputed ───────
+    for start, stop in blocks:
+        path = _block_path(checkpoint_dir, start) if checkpoint_dir else None
+        if path is not None and os.path.exists(path):
+            with np.load(path) as saved:
+                ids[start:stop], scores[start:stop] = saved["ids"], saved["scores"]
+            finish(start, stop)
+        else:
+            pending.append((start, stop))
+
+    def store(start: int, block_ids: np.ndarray, block_scores: np.ndarray) -> None:
+        stop = start + len(block_ids)
+        ids[start:stop], scores[start:stop] = block_ids, block_scores
+        if checkpoint_dir is not None:
+            _save_block(_block_path(checkpoint_dir, start), block_ids, block_scores)
+        finish(start, stop)
+
+    n_jobs = min(_resolve_n_jobs(n_jobs), len(pending))
+    if n_jobs <= 1:
+        for start, stop in pending:
+            block = metric.score(state, slice(start, stop))
+            store(start, *top_k_sparse(block, start, k, chunk))
+    else:
+        with tempfile.TemporaryDirectory(prefix="neighbors-") as shared_dir:
+            specs = _share_state(state, shared_dir)
+            with ProcessPoolExecutor(
+                n_jobs, initializer=_init_worker, initargs=(specs,)
+            ) as pool:
+                futures = [
+                    pool.submit(_score_shard, start, stop, k, metric, chunk)
+                    for start, stop in pending
+                ]
+                for future in as_completed(futures):
+                    store(*future.result())
+
+    if checkpoint_dir is not None:
+        _clear_checkpoints(checkpoint_dir)
+
+    return NeighborIndex(ids, scores)
+
+
+# ── Entry Point ────────────────────────────────────────────────────────────────
+def parse_bytes(text: str) -> int:
+    """'512M' → 536870912.  Accepts K/M/G suffixes or a plain byte count."""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text  = text.strip().upper().removesuffix("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+if __name__ == "__main__":
+    from data_pipeline import build_pipeline
+
+    parser = argparse.ArgumentParser(description="Build the top-K neighbor index.")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--max-memory", type=parse_bytes, default=None,
+                        help="per-block memory ceiling, e.g. 512M or 2G")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="directory for resumable block checkpoints")
+    parser.add_argument("--workers", type=int, default=N_JOBS,
+                        help="worker processes (-1 for one per CPU)")
+    parser.add_argument("--metric", default=METRIC, choices=list(METRICS))
+    args = parser.parse_args()
+
+    matrix = build_pipeline().matrix
+    index = build_neighbor_index(
+        matrix,
+        k=args.top_k,
+        block_size=args.block_size,
+        max_memory=args.max_memory,
+        checkpoint_dir=args.checkpoint_dir,
+        progress=print_progress,
+        n_jobs=args.workers,
+        metric=args.metric,
+    )
+    print(f"[neighbors] ids={index.ids.shape}  scores={index.scores.dtype}")